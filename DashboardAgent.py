@@ -1,6 +1,9 @@
 from crewai import Agent, Crew, Task
 from agent_logic import parse_query_dashboard
-from my_llm_wrapper import OllamaCrewAIWrapper
+from answer_cache import answer_cache
+from crew_pool import CrewPool
+from direct_dispatch import can_dispatch, direct_intents, dispatch
+from my_llm_wrapper import OLLAMA_MODEL, OllamaCrewAIWrapper, generation_options
 from tools.MongoToolWrapper import (
     AttendanceReportTool,
     RevenueMetricsTool,
@@ -14,44 +17,56 @@ from tools.MongoToolWrapper import (
 )
 
 # LLM Wrapper
-ollama_llm = OllamaCrewAIWrapper(model_name="llama3")
+ollama_llm = OllamaCrewAIWrapper(model_name=OLLAMA_MODEL)
+
+# Token cap per LLM step; intents can override it with "num_predict" in their mapping
+DEFAULT_NUM_PREDICT = 256
 
 # Map intents to tools and descriptions
 INTENT_TOOL_MAP = {
     "get_revenue_metrics": {
         "tool": RevenueMetricsTool(),
         "description_template": "Get revenue for month {MONTH}, and year {YEAR} using the Revenue Metrics tool",
-        "expected_output": "Values returned from the function in simple language, not restructured, fail gracefully if values not returned"
+        "expected_output": "Values returned from the function in simple language, not restructured, fail gracefully if values not returned",
+        "direct_args": {"month": "MONTH", "year": "YEAR"}
     },
     "get_outstanding_payment": {
         "tool": OutstandingPaymentsTool(),
         "description_template": "Get outstanding payment value using the OutstandingPayments tool",
-        "expected_output": "Value returned from the function in simple language, not restructured"
+        "expected_output": "Value returned from the function in simple language, not restructured",
+        "direct_args": {}
     },
     "get_active_inactive_client_insights": {
         "tool": ActiveInactiveClientsTool(),
         "description_template": "Get active/inactive client counts using ActiveInactiveClientsTool.",
-        "expected_output": "Value returned from the function in simple language for active count and inactive count, not restructured"
+        "expected_output": "Value returned from the function in simple language for active count and inactive count, not restructured",
+        "direct_args": {}
     },
     "get_client_birthday_reminder": {
         "tool": FetchClientBirthdaysTool(),
         "description_template": "Use this tool to fetch clients with birthdays in the next 30 days. This tool does NOT require any input. It fetches data from MongoDB directly.",
-        "expected_output": "Value returned from the function in simple language for birth dates, not restructured"
+        "expected_output": "Value returned from the function in simple language for birth dates, not restructured",
+        "direct_args": {}
     },
     "get_new_clients_this_month": {
         "tool": NewClientsThisMonthTool(),
         "description_template": "Use this tool to get clients which joined this month. This tool does NOT require any input. It fetches data from MongoDB directly.",
-        "expected_output": "Value returned from the function in simple language for birth dates, not restructured"
+        "expected_output": "Value returned from the function in simple language for birth dates, not restructured",
+        "direct_args": {}
     },
     "get_service_analytics": {
         "tool": ServiceAnalyticsTool(),
         "description_template": "Get service analytics including enrollment trends, top services, and course completion rates using the ServiceAnalyticsTool. This tool does NOT require any input. It fetches data from MongoDB directly.",
-        "expected_output": "Analytics returned in a simple text format covering trends, top services, and completions."
+        "expected_output": "Analytics returned in a simple text format covering trends, top services, and completions.",
+        "direct_args": {},
+        "num_predict": 512
     },
     "get_attendance_report": {
         "tool": AttendanceReportTool(),
         "description_template": "Get attendance percentages and drop-off rates. class id is {CLASS_ID}. This tool does NOT require any input. It fetches data from MongoDB directly.",
-        "expected_output": "Value returned in simple text format for attendance and drop-off."
+        "expected_output": "Value returned in simple text format for attendance and drop-off.",
+        "direct_args": {"class_id": "CLASS_ID"},
+        "num_predict": 512
     }
 
     # "get_service_analytics": {
@@ -64,25 +79,51 @@ INTENT_TOOL_MAP = {
     # }
 }
 
-# Initialize the agent
-dashboard_agent = Agent(
-    name="Dashboard Agent",
-    role="Provide analytics and metrics useful for business owners by using the tools",
-    goal="""Deliver business insights such as revenue, client stats, attendance, 
-            and course performance using MongoDB data.""",
-    backstory="""You are a data-savvy assistant for a fitness business. You use 
-                 data from MongoDB to answer questions about revenue, clients, 
-                 courses, and attendance. Your responses should help owners make decisions.""",
-    tools=[tool["tool"] for tool in INTENT_TOOL_MAP.values()],
-    verbose=True,
-    llm=ollama_llm,
-    allow_delegation=True,
-    allow_multiple_tool_calls_per_step=True
-)
+# Intents answered by calling the tool directly instead of running the crew.
+# "direct_args" maps tool arguments to entity keys, "required_entities" lists
+# what must be resolved first, "response_template" renders the tool output.
+DIRECT_INTENTS = direct_intents("DASHBOARD_DIRECT_INTENTS", INTENT_TOOL_MAP)
 
-def run_dashboard_agent(query):
+def build_dashboard_crew():
+    # The task is a template, each run fills it through kickoff(inputs=...)
+    dashboard_agent = Agent(
+        name="Dashboard Agent",
+        role="Provide analytics and metrics useful for business owners by using the tools",
+        goal="""Deliver business insights such as revenue, client stats, attendance, 
+                and course performance using MongoDB data.""",
+        backstory="""You are a data-savvy assistant for a fitness business. You use 
+                     data from MongoDB to answer questions about revenue, clients, 
+                     courses, and attendance. Your responses should help owners make decisions.""",
+        tools=[tool["tool"] for tool in INTENT_TOOL_MAP.values()],
+        verbose=True,
+        llm=ollama_llm,
+        allow_delegation=True,
+        allow_multiple_tool_calls_per_step=True,
+        cache=False
+    )
+    task = Task(
+        description="{description}",
+        agent=dashboard_agent,
+        expected_output="{expected_output}"
+    )
+    return Crew(
+        agents=[dashboard_agent],
+        tasks=[task],
+        verbose=True,
+        allow_tool_use=True,
+        allow_multiple_tool_calls_per_step=True,
+        # Pooled crews live for the whole process: crewAI's tool cache would never
+        # expire and would bypass the answer cache invalidation and KPI rollups
+        cache=False
+    )
+
+dashboard_crew_pool = CrewPool("dashboard", build_dashboard_crew)
+
+def run_dashboard_agent(query, parsed=None):
     # query = "Können Sie Kunden abrufen, deren Geburtstag bald ansteht?"
-    parsed = parse_query_dashboard(query)
+    # Callers that already parsed the query (e.g. on the inference executor) pass it in
+    if parsed is None:
+        parsed = parse_query_dashboard(query)
     print(f"[DEBUG] Parsed result : {parsed}")
 
 
@@ -90,7 +131,17 @@ def run_dashboard_agent(query):
     entities = parsed.get("entities", {})
 
     # Match to tool
-    mapping = INTENT_TOOL_MAP[intent]
+    mapping = INTENT_TOOL_MAP.get(intent)
+    if not mapping:
+        raise ValueError(f"❌ No tool found for intent: {intent}")
+
+    # Paraphrases resolving to the same intent and tool arguments share one answer
+    return answer_cache.get_or_compute(
+        "dashboard", intent, entities, mapping.get("direct_args", {}).values(),
+        lambda: answer_dashboard_intent(intent, mapping, entities)
+    )
+
+def answer_dashboard_intent(intent, mapping, entities):
     description = mapping["description_template"].format(
         MONTH=entities.get("MONTH", "Unknown"),
         MISC=entities.get("MISC", "Unknown"),
@@ -98,49 +149,23 @@ def run_dashboard_agent(query):
         CLASS_ID= entities.get("CLASS_ID", "Unknown")
     )
     expected_output = mapping["expected_output"]
-    if not mapping:
-        raise ValueError(f"❌ No tool found for intent: {intent}")
-
     tool = mapping["tool"]
 
-    # Build input args (pass month and year if present)
-    args = {}
-    if "MONTH" in entities:
-        args["month"] = entities["MONTH"]
-    if "YEAR" in entities:
-        args["year"] = entities["YEAR"]
-
-    # Create a Task for the Agent to execute
-    task = Task(
-        description=description,
-        agent=dashboard_agent,
-        expected_output=expected_output,
-        input= entities
-    )
-
-    print("\n[DEBUG] --- Task Created ---")
-    print("[DEBUG] Task Object:", task)
-
-    crew = Crew(
-        agents=[dashboard_agent],
-        tasks=[task],
-        verbose=True,
-        allow_tool_use=True,
-        allow_multiple_tool_calls_per_step=True
-    )
-
-    print("[DEBUG] Crew Configured:")
-    print(f"Agents: {[agent for agent in crew.agents]}")
-    print(f"Tasks: {[t.name for t in crew.tasks]}")
+    if intent in DIRECT_INTENTS and can_dispatch(mapping, entities):
+        try:
+            return dispatch(tool, mapping, entities)
+        except Exception as e:
+            print(f"[ERROR] Direct dispatch for {intent} failed, falling back to the crew: {e}")
 
-    
     print("\n🚀 Starting Crew Task Execution...\n")
-    try:
-        result = crew.kickoff()
-        print("\n✅ Result:")
-        print(result)
-        return result
-    except Exception as e:
-        import traceback
-        print("\n❌ Crew failed:")
-        traceback.print_exc()
\ No newline at end of file
+    # Raises PoolExhausted when every crew stays busy past the timeout
+    with dashboard_crew_pool.checkout() as crew, generation_options(num_predict=mapping.get("num_predict", DEFAULT_NUM_PREDICT)):
+        try:
+            result = crew.kickoff(inputs={"description": description, "expected_output": expected_output})
+            print("\n✅ Result:")
+            print(result)
+            return result
+        except Exception as e:
+            import traceback
+            print("\n❌ Crew failed:")
+            traceback.print_exc()
\ No newline at end of file
@@ -8,7 +8,10 @@ from crewai import Agent, Task, Crew
 from langchain_ollama import OllamaLLM
 
 from agent_logic import parse_query_support
-from my_llm_wrapper import OllamaCrewAIWrapper
+from answer_cache import answer_cache
+from crew_pool import CrewPool
+from direct_dispatch import can_dispatch, direct_intents, dispatch
+from my_llm_wrapper import OLLAMA_MODEL, OllamaCrewAIWrapper, generation_options
 from tools.ExternalApiWrapper import CreateEnquiryTool, CreateOrderTool
 from tools.MongoToolWrapper import (
     GetClientInfoTool,
@@ -23,64 +26,114 @@ provider = TracerProvider()
 provider.add_span_processor(SimpleSpanProcessor(ConsoleSpanExporter()))
 
 # Initialize your model wrapper
-ollama_llm = OllamaCrewAIWrapper(model_name="llama3")
+ollama_llm = OllamaCrewAIWrapper(model_name=OLLAMA_MODEL)
+
+# Token cap per LLM step; intents can override it with "num_predict" in their mapping
+DEFAULT_NUM_PREDICT = 256
 
 # === Define intent-to-tool mapping ===
 INTENT_TOOL_MAP = {
     "create_order": {
         "tool": CreateOrderTool,
         "description_template": "Create an order for {MISC} for client {PER} with email {EMAIL} and phone number {PHONE}",
-        "expected_output": "Confirmation of order creation"
+        "expected_output": "Confirmation of order creation",
+        "direct_args": {"PER": "PER", "MISC": "MISC"},
+        "required_entities": ["PER", "MISC"]
     },
     "create_enquiry": {
         "tool": CreateEnquiryTool,
         "description_template": "Create an enquiry for {MISC} for {PER} with email {EMAIL} and phone number {PHONE}",
-        "expected_output": "Confirmation of enquiry creation"
+        "expected_output": "Confirmation of enquiry creation",
+        "direct_args": {"PER": "PER", "EMAIL": "EMAIL", "PHONE": "PHONE", "MISC": "MISC"},
+        "required_entities": [("EMAIL", "PHONE")]
     },
     "get_client_info": {
         "tool": GetClientInfoTool,
         "description_template": "Fetch information for client {PER} with email {EMAIL} and phone number {PHONE}",
-        "expected_output": "Client info retrieved"
+        "expected_output": "Client info retrieved",
+        "direct_args": {"name": "PER", "email": "EMAIL", "phone": "PHONE"},
+        "required_entities": [("PER", "EMAIL", "PHONE")],
+        "response_template": "👤 Client details:\n{result}"
     },
     "get_client_services": {
         "tool": GetClientServicesTool,
         "description_template": "Get services for client {PER}",
-        "expected_output": "List of client services"
+        "expected_output": "List of client services",
+        "direct_args": {"name": "PER"},
+        "required_entities": ["PER"]
     },
     "list_upcoming_classes": {
         "tool": ListClassesTool,
         "description_template": "List all available classes and use the tool described by ListClassesTool",
-        "expected_output": "List of classes from the database"
+        "expected_output": "List of classes from the database",
+        "direct_args": {},
+        "num_predict": 512,
+        "response_template": "📅 Upcoming classes:\n{result}"
     },
     "filter_classes_by_instructor": {
         "tool": FilterClassesByInstructorTool,
         "description_template": "Filter classes by instructor {PER} using the tool described by FilterClassesByInstructor",
-        "expected_output": "Filtered class list"
+        "expected_output": "Filtered class list",
+        "direct_args": {"name": "PER"},
+        "required_entities": ["PER"]
     },
     "filter_classes_by_status": {
         "tool": FilterClassesByStatusTool,
         "description_template": "Filter classes with status {STATUS}",
-        "expected_output": "Filtered class list"
+        "expected_output": "Filtered class list",
+        "direct_args": {"name": "STATUS"},
+        "required_entities": ["STATUS"]
     },
 }
 
-# === Agent with all tools ===
-support_agent = Agent(
-    name="Support Agent",
-    role="Help customers resolve their queries",
-    goal="Handle customer requests",
-    backstory="You are responsible for managing orders and clients.",
-    tools=[
-        tool_class()
-        for tool_class in {mapping["tool"] for mapping in INTENT_TOOL_MAP.values()}
-    ],
-    llm=ollama_llm,
-    allow_delegation=True,
-    allow_multiple_tool_calls_per_step=True
-)
+# One shared instance per tool class, used by the agent and by direct dispatch
+TOOL_INSTANCES = {
+    tool_class: tool_class()
+    for tool_class in {mapping["tool"] for mapping in INTENT_TOOL_MAP.values()}
+}
+
+# Intents answered by calling the tool directly instead of running the crew.
+# "required_entities" entries are entity keys, or tuples where one key is enough.
+DIRECT_INTENTS = direct_intents("SUPPORT_DIRECT_INTENTS", INTENT_TOOL_MAP)
+
+# Intents that write; a failed direct call is not retried through the crew,
+# which could write a second time
+WRITE_INTENTS = {"create_order", "create_enquiry"}
+
+# === Pool of crews, each with its own agent and a templated task ===
+def build_support_crew():
+    support_agent = Agent(
+        name="Support Agent",
+        role="Help customers resolve their queries",
+        goal="Handle customer requests",
+        backstory="You are responsible for managing orders and clients.",
+        tools=list(TOOL_INSTANCES.values()),
+        llm=ollama_llm,
+        allow_delegation=True,
+        allow_multiple_tool_calls_per_step=True,
+        cache=False
+    )
+    task = Task(
+        description="{description}",
+        expected_output="{expected_output}",
+        agent=support_agent
+    )
+    return Crew(
+        agents=[support_agent],
+        tasks=[task],
+        verbose=True,
+        allow_multiple_tool_calls_per_step=True,
+        # No crewAI tool cache on pooled crews: it never expires, and a cached
+        # "Order created" would skip the write on a repeated request
+        cache=False
+    )
 
-def run_support_agent(query):
-    parsed_result = parse_query_support(query)
+support_crew_pool = CrewPool("support", build_support_crew)
+
+def run_support_agent(query, parsed_result=None):
+    # Callers that already parsed the query (e.g. on the inference executor) pass it in
+    if parsed_result is None:
+        parsed_result = parse_query_support(query)
     print(f"[DEBUG] Parsed result : {parsed_result}")
 
     intent = parsed_result.get("intent")
@@ -91,6 +144,22 @@ def run_support_agent(query):
         raise ValueError(f"❌ Unsupported intent: {intent}")
 
     mapping = INTENT_TOOL_MAP[intent]
+    # Read intents are served from the answer cache until a write touches their collections
+    return answer_cache.get_or_compute(
+        "support", intent, entities, mapping.get("direct_args", {}).values(),
+        lambda: answer_support_intent(intent, mapping, entities)
+    )
+
+def answer_support_intent(intent, mapping, entities):
+    if intent in DIRECT_INTENTS and can_dispatch(mapping, entities):
+        try:
+            return dispatch(TOOL_INSTANCES[mapping["tool"]], mapping, entities)
+        except Exception as e:
+            if intent in WRITE_INTENTS:
+                print(f"[ERROR] Direct dispatch for {intent} failed: {e}")
+                return f"❌ Could not complete {intent}: {e}"
+            print(f"[ERROR] Direct dispatch for {intent} failed, falling back to the crew: {e}")
+
     description = mapping["description_template"].format(
         PER=entities.get("PER", "Unknown"),
         MISC=entities.get("MISC", "Unknown"),
@@ -108,28 +177,15 @@ def run_support_agent(query):
     }
     print("[DEBUG] Clean entities after sanitizing:", clean_entities)
 
-    task = Task(
-        description=description,
-        expected_output=expected_output,
-        agent=support_agent,
-        input=clean_entities
-    )
-
-    # === Crew setup ===
-    crew = Crew(
-        agents=[support_agent],
-        tasks=[task],
-        verbose=True,
-        allow_multiple_tool_calls_per_step=True
-    )
-
     print("\n🚀 Starting Crew Task Execution...\n")
-    try:
-        result = crew.kickoff()
-        print("\n✅ Result:")
-        print(result)
-        return result
-    except Exception as e:
-        import traceback
-        print("\n❌ Crew failed:")
-        traceback.print_exc()
\ No newline at end of file
+    # Raises PoolExhausted when every crew stays busy past the timeout
+    with support_crew_pool.checkout() as crew, generation_options(num_predict=mapping.get("num_predict", DEFAULT_NUM_PREDICT)):
+        try:
+            result = crew.kickoff(inputs={**clean_entities, "description": description, "expected_output": expected_output})
+            print("\n✅ Result:")
+            print(result)
+            return result
+        except Exception as e:
+            import traceback
+            print("\n❌ Crew failed:")
+            traceback.print_exc()
\ No newline at end of file
@@ -1,12 +1,75 @@
-from transformers import pipeline
+import calendar
+import copy
+import functools
+import os
 import re
+import threading
 import langdetect
 
-# Zero-shot classifier for intent detection
-intent_classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+from cache_utils import LRUTTLCache
+from client_resolver import normalize_name
 
-# Named Entity Recognizer
-ner_pipeline = pipeline("ner", model="dslim/bert-base-NER", aggregation_strategy="simple")
+from intent_backends import get_intent_backend
+from inference_batcher import MicroBatcher
+from model_registry import registry
+from onnx_backend import active_backends, build_pipeline
+from price_catalog import price_catalog
+
+# Models are loaded on first use or by warm_up_models(), not at import time.
+# Intent classifier returns {"labels": [...], "scores": [...]} like the zero-shot pipeline.
+# Backend is picked with INTENT_BACKEND ("embedding" or "zero_shot")
+registry.register("intent_classifier", get_intent_backend)
+
+# Named Entity Recognizer, on torch or onnxruntime depending on INFERENCE_BACKEND
+registry.register("ner", lambda: build_pipeline("ner", "dslim/bert-base-NER", aggregation_strategy="simple"))
+
+REQUIRED_MODELS = ["intent_classifier", "ner"]
+
+def warm_up_models():
+    # Marian translation models are warmed too (TRANSLATION_WARM_UP) but do not gate readiness,
+    # since translation falls back to Google
+    return registry.warm_up(REQUIRED_MODELS + translator.warm_up_model_names())
+
+def models_ready():
+    return registry.is_ready(REQUIRED_MODELS)
+
+def _classify_intent_batch(items):
+    # items are (query, labels) pairs; queries sharing a label set run as one batch
+    results = [None] * len(items)
+    groups = {}
+    for i, (query, labels) in enumerate(items):
+        groups.setdefault(tuple(labels), []).append(i)
+
+    for labels, indices in groups.items():
+        outputs = registry.get("intent_classifier")([items[i][0] for i in indices], list(labels))
+        if isinstance(outputs, dict):
+            outputs = [outputs]
+        for i, output in zip(indices, outputs):
+            results[i] = output
+    return results
+
+def _extract_entities_batch(queries):
+    return registry.get("ner")(queries, batch_size=len(queries))
+
+intent_batcher = MicroBatcher("intent", _classify_intent_batch)
+ner_batcher = MicroBatcher("ner", _extract_entities_batch)
+
+def classify_intent(query, labels):
+    return intent_batcher((query, labels))
+
+def extract_entities(query):
+    return ner_batcher(query)
+
+def inference_metrics():
+    return {
+        "backends": dict(active_backends),
+        "intent": intent_batcher.metrics(),
+        "ner": ner_batcher.metrics(),
+        "parse_cache": parse_cache.stats(),
+        "translation": translator.stats(),
+        "language_detection": dict(language_detection_stats),
+        "intent_routes": {route: dict(counts) for route, counts in intent_route_stats.items()}
+    }
 
 INTENT_LABELS_SUPPORT = [
     "create_order",
@@ -28,6 +91,7 @@ INTENT_LABELS_DASHBOARD=[
     "get_attendance_report"
 ]
 
+# Fallback for when the price catalog (courses collection) cannot be loaded
 SERVICE_NAMES = [
     "Yoga Beginner", "Strength Training", "Zumba Advanced",
     "HIIT Express", "Pilates Intermediate", "Meditation Basics"
@@ -52,6 +116,120 @@ MONTHS = {
     "december": 12, "dec": 12
 }
 
+# Keyword/pattern fast path for intents. Each pattern carries the confidence it
+# gives its intent; the NLI model only runs when the best rule is below
+# INTENT_RULE_THRESHOLD or two intents match with similar confidence.
+INTENT_RULES = {
+    # Support agent
+    "create_order": [
+        (r"\b(create|place|make|add|book)\b.*\border\b", 0.95),
+        (r"\benrol+\b.*\bfor\b", 0.85),
+    ],
+    "create_enquiry": [
+        (r"\b(enquir|inquir)(y|ies)\b", 0.95),
+    ],
+    "list_upcoming_classes": [
+        (r"\bupcoming\b.*\b(class|classes|courses?)\b", 0.9),
+        (r"\bclass schedule\b", 0.85),
+    ],
+    "get_client_info": [
+        (r"\b(client|member|customer)\s+(info|information|details|profile)\b", 0.9),
+        (r"[\w\.-]+@[\w\.-]+", 0.6),
+        (r"\b\d{10}\b", 0.6),
+    ],
+    "get_client_services": [
+        (r"\b(client|member)\s+services\b", 0.95),
+        (r"\b(enrolled|subscribed) (in|to)\b", 0.9),
+    ],
+    "filter_classes_by_instructor": [
+        (r"\b(instructor|trainer|coach)\b", 0.9),
+        (r"\btaught by\b", 0.9),
+    ],
+    "filter_classes_by_status": [
+        (r"\b(scheduled|completed|ongoing|canceled|cancelled)\b", 0.85),
+        (r"\bstatus\b", 0.85),
+    ],
+    # Dashboard agent
+    "get_revenue_metrics": [
+        (r"\b(revenue|earnings?|income|sales)\b", 0.95),
+    ],
+    "get_outstanding_payment": [
+        (r"\b(outstanding|unpaid|dues?)\b", 0.95),
+        (r"\bpending payments?\b", 0.95),
+    ],
+    "get_active_inactive_client_insights": [
+        (r"\b(in)?active\b", 0.9),
+    ],
+    "get_client_birthday_reminder": [
+        (r"\bbirthdays?\b", 0.97),
+    ],
+    "get_new_clients_this_month": [
+        (r"\bnew (clients?|members?)\b", 0.9),
+        (r"\b(clients?|members?)\b.*\b(joined|signed up)\b", 0.9),
+    ],
+    "get_service_analytics": [
+        (r"\bservice analytics\b", 0.97),
+        (r"\b(enrol+ment trends?|top services|completion rates?|popular services)\b", 0.9),
+    ],
+    "get_attendance_report": [
+        (r"\battendance\b", 0.95),
+        (r"\bdrop[- ]?(off|out)s?\b", 0.9),
+        (r"\bclass[_\s]?\d+\b", 0.85),
+    ],
+}
+
+COMPILED_INTENT_RULES = {
+    intent: [(re.compile(pattern, re.IGNORECASE), confidence) for pattern, confidence in patterns]
+    for intent, patterns in INTENT_RULES.items()
+}
+
+INTENT_RULE_THRESHOLD = float(os.getenv("INTENT_RULE_THRESHOLD", "0.8"))
+INTENT_RULE_MARGIN = 0.2
+
+intent_route_stats = {"rules": {}, "model": {}}
+_route_stats_lock = threading.Lock()
+
+def _count_route(route, intent):
+    with _route_stats_lock:
+        counts = intent_route_stats[route]
+        counts[intent] = counts.get(intent, 0) + 1
+
+def route_intent(query, labels):
+    """
+    Score the query against the rule table for the given labels. Returns a
+    zero-shot shaped result when the rules are confident enough, else None.
+    """
+    scores = {}
+    for label in labels:
+        for pattern, confidence in COMPILED_INTENT_RULES.get(label, []):
+            if confidence > scores.get(label, 0) and pattern.search(query):
+                scores[label] = confidence
+    if not scores:
+        return None
+
+    ranked = sorted(labels, key=lambda label: -scores.get(label, 0))
+    best = scores[ranked[0]]
+    second = scores.get(ranked[1], 0) if len(ranked) > 1 else 0
+    confidence = best if best - second >= INTENT_RULE_MARGIN else best - second
+    if confidence < INTENT_RULE_THRESHOLD:
+        return None
+
+    return {
+        "sequence": query,
+        "labels": ranked,
+        "scores": [confidence] + [scores.get(label, 0) for label in ranked[1:]],
+        "route": "rules"
+    }
+
+def resolve_intent(query, labels):
+    intent_result = route_intent(query, labels)
+    route = "rules"
+    if intent_result is None:
+        intent_result = classify_intent(query, labels)
+        route = "model"
+    _count_route(route, intent_result["labels"][0])
+    return intent_result
+
 def extract_class_id(query):
     # Try to find something like 'class_22'
     match = re.search(r'class[_\s]?(\d+)', query, re.IGNORECASE)
@@ -60,9 +238,10 @@ def extract_class_id(query):
     return None
 
 def extract_month(query):
-    for word in query.lower().split():
+    # Always the full month name, so "jan" and "January" resolve the same way
+    for word in re.findall(r"[a-z]+", query.lower()):
         if word in MONTHS:
-            return word.capitalize()
+            return calendar.month_name[MONTHS[word]]
     return None
 
 def extract_year(query):
@@ -79,8 +258,9 @@ def extract_status(query):
     return None
 
 def extract_service(query):
-    for service in SERVICE_NAMES:
-        if service.lower() in query.lower():
+    normalized_query = normalize_name(query)
+    for service in price_catalog.service_names(fallback=SERVICE_NAMES):
+        if normalize_name(service) in normalized_query:
             return service
     return None
 
@@ -124,29 +304,129 @@ def merge_entities(entities_raw):
 
     return merged
 
-from deep_translator import GoogleTranslator
-import langdetect
+from translator import build_translator
 
-def detect_language(text):
+# Persistent (SQLite) + in-memory translation cache in front of the backends
+# listed in TRANSLATION_BACKENDS (local MarianMT for de/hi first, then Google)
+translator = build_translator()
+
+# Tiered language detection: Unicode script first, then a cheap English
+# vocabulary check for ASCII text, and langdetect only for what is left.
+langdetect.DetectorFactory.seed = 0  # langdetect is nondeterministic unless seeded
+
+SCRIPT_RANGES = [
+    (0x0900, 0x097F, "hi"),  # Devanagari
+]
+
+ENGLISH_WORDS = {
+    "a", "all", "am", "an", "and", "any", "are", "as", "at", "be", "by", "can", "could", "did",
+    "do", "does", "for", "from", "had", "has", "have", "how", "i", "in", "is", "it", "last",
+    "many", "me", "much", "my", "next", "now", "of", "on", "or", "our", "please", "so", "soon",
+    "that", "the", "their", "there", "this", "till", "to", "up", "was", "we", "were", "what",
+    "when", "which", "who", "whose", "why", "will", "with", "you", "your",
+    "active", "add", "analytics", "attendance", "birthday", "birthdays", "book", "class",
+    "classes", "client", "clients", "coming", "count", "counts", "course", "courses", "create",
+    "details", "email", "enquiry", "fetch", "find", "get", "inactive", "info", "information",
+    "instructor", "joined", "list", "members", "metrics", "month", "new", "order", "outstanding",
+    "payment", "payments", "phone", "rate", "rates", "report", "reports", "retrieve", "revenue",
+    "service", "services", "show", "status", "total", "trainer", "upcoming", "year",
+}
+
+# Short function words of the other supported languages (romanized Hindi included)
+NON_ENGLISH_WORDS = {
+    "der", "die", "das", "und", "ist", "fur", "mit", "von", "bitte", "alle", "ein", "eine",
+    "hai", "ka", "ki", "ke", "ko", "kya", "mujhe", "aur", "se", "karo", "kijiye",
+}
+
+ENGLISH_MIN_RATIO = 0.5
+
+language_detection_stats = {"script": 0, "english_heuristic": 0, "langdetect": 0, "langdetect_cached": 0}
+_language_stats_lock = threading.Lock()
+
+def _count_language_tier(tier):
+    with _language_stats_lock:
+        language_detection_stats[tier] += 1
+
+def _detect_by_script(text):
+    for char in text:
+        code = ord(char)
+        for start, end, language in SCRIPT_RANGES:
+            if start <= code <= end:
+                return language
+    return None
+
+def _looks_english(text):
+    if not text.isascii():
+        return False
+    words = re.findall(r"[a-z]+", text.lower())
+    if not words or any(word in NON_ENGLISH_WORDS for word in words):
+        return False
+    return sum(word in ENGLISH_WORDS for word in words) / len(words) >= ENGLISH_MIN_RATIO
+
+@functools.lru_cache(maxsize=4096)
+def _langdetect(text):
     return langdetect.detect(text)
 
-def translate_text(text, target_language="en"):
-    return GoogleTranslator(source="auto", target=target_language).translate(text)
+def detect_language(text):
+    language = _detect_by_script(text)
+    if language:
+        _count_language_tier("script")
+        return language
+
+    if _looks_english(text):
+        _count_language_tier("english_heuristic")
+        return "en"
+
+    hits = _langdetect.cache_info().hits
+    language = _langdetect(text)
+    _count_language_tier("langdetect_cached" if _langdetect.cache_info().hits > hits else "langdetect")
+    return language
+
+def translate_text(text, target_language="en", source_language="auto"):
+    return translator.translate(text, source_language, target_language)
 
 def translation(text):
     original_language = detect_language(text)
     if original_language == "en":
         return text
-    translated_text = translate_text(text, "en")
+    # The detected code selects a local Marian model; the Google fallback auto-detects
+    translated_text = translate_text(text, "en", original_language)
     print(f"[DEBUG] Translated: '{translated_text}' from '{original_language}'")
     return translated_text
 
+# Cache of full parse results (translation + intent + entities) keyed on the
+# normalized query and the label set. Case is kept because NER is case-sensitive.
+parse_cache = LRUTTLCache(
+    max_entries=int(os.getenv("PARSE_CACHE_MAX_ENTRIES", "2048")),
+    max_bytes=int(os.getenv("PARSE_CACHE_MAX_BYTES", str(8 * 2**20))),
+    ttl=float(os.getenv("PARSE_CACHE_TTL", "3600"))
+)
+
+def normalize_query(query):
+    return " ".join(query.split()).rstrip(" ?.!")
+
+def cached_parse(agent, labels, query, parse_fn):
+    key = (agent, normalize_query(query), tuple(labels))
+    cached = parse_cache.get(key)
+    if cached is not None:
+        return copy.deepcopy(cached)
+
+    result = parse_fn(query)
+    parse_cache.set(key, copy.deepcopy(result))
+    return result
+
 def parse_query_support(query: str):
+    return cached_parse("support", INTENT_LABELS_SUPPORT, query, _parse_query_support)
+
+def parse_query_dashboard(query: str):
+    return cached_parse("dashboard", INTENT_LABELS_DASHBOARD, query, _parse_query_dashboard)
+
+def _parse_query_support(query: str):
     query= translation(query)
-    intent_result = intent_classifier(query, INTENT_LABELS_SUPPORT)
+    intent_result = resolve_intent(query, INTENT_LABELS_SUPPORT)
     intent = intent_result["labels"][0]
 
-    entities_raw = ner_pipeline(query)
+    entities_raw = extract_entities(query)
     named_entities = merge_entities(entities_raw)
 
     # Add regex-based email/phone extraction
@@ -175,12 +455,12 @@ def parse_query_support(query: str):
         }
     }
 
-def parse_query_dashboard(query: str):
+def _parse_query_dashboard(query: str):
     query= translation(query)
-    intent_result = intent_classifier(query, INTENT_LABELS_DASHBOARD)
+    intent_result = resolve_intent(query, INTENT_LABELS_DASHBOARD)
     intent = intent_result["labels"][0]
 
-    entities_raw = ner_pipeline(query)
+    entities_raw = extract_entities(query)
     named_entities = merge_entities(entities_raw)
 
     # # Add regex-based email/phone extraction
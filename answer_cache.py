@@ -0,0 +1,114 @@
+# answer_cache.py
+import os
+import threading
+from collections import defaultdict
+
+from cache_utils import LRUTTLCache
+
+ANSWER_CACHE_DEFAULT_TTL = float(os.getenv("ANSWER_CACHE_TTL", "300"))
+
+# Collections each read intent depends on. Intents not listed here (the
+# create_* ones) are never cached.
+INTENT_COLLECTIONS = {
+    # Dashboard agent
+    "get_revenue_metrics": ["payments"],
+    "get_outstanding_payment": ["orders"],
+    "get_active_inactive_client_insights": ["clients"],
+    "get_client_birthday_reminder": ["clients"],
+    "get_new_clients_this_month": ["clients"],
+    "get_service_analytics": ["orders"],
+    "get_attendance_report": ["attendance"],
+    # Support agent
+    "list_upcoming_classes": ["classes"],
+    "get_client_info": ["clients"],
+    "get_client_services": ["clients", "orders"],
+    "filter_classes_by_instructor": ["classes"],
+    "filter_classes_by_status": ["classes"],
+}
+
+# Seconds an answer stays valid even without a write, for intents that
+# depend on today's date or that change often
+INTENT_TTLS = {
+    "get_client_birthday_reminder": 3600,
+    "get_new_clients_this_month": 3600,
+    "list_upcoming_classes": 600,
+}
+
+
+class AnswerCache:
+    """
+    Caches final agent answers keyed by (agent, intent, normalized entities).
+    Every entry is indexed by the collections its intent reads, and any write
+    to one of those collections drops it. Writes bump a per-collection
+    generation so an answer computed while a write happened is not stored.
+    Invalidation is per process.
+    """
+
+    def __init__(self, default_ttl=ANSWER_CACHE_DEFAULT_TTL):
+        self.default_ttl = default_ttl
+        self._cache = LRUTTLCache(
+            max_entries=4096, max_bytes=16 * 2**20, ttl=default_ttl, on_evict=self._forget
+        )
+        self._keys_by_collection = defaultdict(set)
+        self._generations = defaultdict(int)
+        # Reentrant: an eviction during _cache.set() calls _forget() on the same thread
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def make_key(agent, intent, entities, entity_keys):
+        normalized = tuple(sorted(
+            (key, " ".join(str(entities[key]).split()).casefold())
+            for key in entity_keys
+            if entities.get(key) not in (None, "", "Unknown")
+        ))
+        return agent, intent, normalized
+
+    def get_or_compute(self, agent, intent, entities, entity_keys, compute):
+        collections = INTENT_COLLECTIONS.get(intent)
+        if collections is None:
+            return compute()
+
+        key = self.make_key(agent, intent, entities, entity_keys)
+        cached = self._cache.get(key)
+        if cached is not None:
+            print(f"[DEBUG] Answer cache hit for {key}")
+            return cached
+
+        with self._lock:
+            generations = [self._generations[c] for c in collections]
+        result = compute()
+        if result is None:
+            return result
+
+        with self._lock:
+            if generations != [self._generations[c] for c in collections]:
+                return result
+            self._cache.set(key, result, ttl=INTENT_TTLS.get(intent, self.default_ttl))
+            for collection in collections:
+                self._keys_by_collection[collection].add(key)
+        return result
+
+    def _forget(self, key):
+        # Drop an evicted or expired answer from the collection index
+        with self._lock:
+            if key in self._cache:
+                return  # stored again since it was evicted
+            for collection in INTENT_COLLECTIONS.get(key[1], ()):
+                keys = self._keys_by_collection.get(collection)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._keys_by_collection[collection]
+
+    def invalidate(self, *collections):
+        with self._lock:
+            for collection in collections:
+                self._generations[collection] += 1
+                for key in self._keys_by_collection.pop(collection, set()):
+                    self._cache.delete(key)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+answer_cache = AnswerCache()
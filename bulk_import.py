@@ -0,0 +1,132 @@
+# bulk_import.py
+import asyncio
+import codecs
+import csv
+import json
+import time
+from datetime import datetime, timezone
+
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+import kpi_rollups
+import services
+from client_resolver import normalize_name
+from dates import birth_md
+
+IMPORT_MODELS = {
+    "clients": services.ClientRecord,
+    "orders": services.OrderRecord,
+    "payments": services.PaymentRecord,
+    "attendance": services.AttendanceRecord,
+    "enquiries": services.EnquiryRecord,
+    "courses": services.CourseRecord,
+}
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+def _text_lines(binary_file):
+    # Decode the upload incrementally instead of reading it whole
+    return codecs.getreader("utf-8-sig")(binary_file)
+
+
+def iter_rows(binary_file, fmt):
+    """Yield (row_number, dict) pairs from an NDJSON or CSV upload; unparsable rows yield the error."""
+    if fmt == "csv":
+        reader = csv.DictReader(_text_lines(binary_file))
+        for row_number, row in enumerate(reader, start=1):
+            # Empty cells mean "not provided", so optional fields fall back to their defaults
+            yield row_number, {k: v for k, v in row.items() if k and v not in (None, "")}
+        return
+
+    for row_number, line in enumerate(_text_lines(binary_file), start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, e
+            continue
+        yield row_number, row if isinstance(row, dict) else ValueError("row is not a JSON object")
+
+
+def record_document(collection, record):
+    data = record.model_dump(by_alias=True, exclude_none=True)
+    if collection in ("orders", "enquiries") and "created_on" not in data:
+        data["created_on"] = datetime.now(timezone.utc)
+    if collection == "clients":
+        data["name_normalized"] = normalize_name(data["name"])
+        if data.get("birthdate"):
+            data["birth_md"] = birth_md(data["birthdate"])
+    return data
+
+
+async def _insert_batch(db, collection, batch, report):
+    documents = [doc for _, doc in batch]
+    try:
+        result = await db[collection].insert_many(documents, ordered=False)
+        report["inserted"] += len(result.inserted_ids)
+    except BulkWriteError as e:
+        # ordered=False: every valid document is written, only the failing ones are reported
+        details = e.details
+        report["inserted"] += details.get("nInserted", 0)
+        for error in details.get("writeErrors", []):
+            _add_error(report, batch[error["index"]][0], error.get("errmsg", "write error"))
+
+
+def _add_error(report, row_number, message):
+    report["failed"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"row": row_number, "error": message})
+
+
+def _parse_batch(rows, model, collection, batch_size, report):
+    """Validate rows until batch_size documents are ready or the upload ends; bad rows go to the report."""
+    batch = []
+    for row_number, row in rows:
+        report["rows"] += 1
+        if isinstance(row, Exception):
+            _add_error(report, row_number, f"Unparsable row: {row}")
+            continue
+        try:
+            record = model.model_validate(row)
+        except ValidationError as e:
+            _add_error(report, row_number, "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            ))
+            continue
+        batch.append((row_number, record_document(collection, record)))
+        if len(batch) >= batch_size:
+            break
+    return batch
+
+
+async def import_records(db, collection, binary_file, fmt="ndjson", batch_size=IMPORT_BATCH_SIZE):
+    """
+    Validate every row with the collection's pydantic model and write valid
+    rows with unordered insert_many batches. Returns counts, per-row errors
+    and throughput.
+    """
+    model = IMPORT_MODELS[collection]
+    report = {"collection": collection, "rows": 0, "inserted": 0, "failed": 0, "errors": []}
+    started = time.perf_counter()
+
+    rows = iter_rows(binary_file, fmt)
+    while True:
+        # File reads, parsing and validation are blocking; only the inserts run on the event loop
+        batch = await asyncio.to_thread(_parse_batch, rows, model, collection, batch_size, report)
+        if not batch:
+            break
+        await _insert_batch(db, collection, batch, report)
+
+    services.after_bulk_import(collection)
+    if collection in kpi_rollups.SOURCE_COLLECTIONS and report["inserted"]:
+        # Cheaper to recompute once than to $inc per imported row
+        await kpi_rollups.areconcile(db)
+    elapsed = time.perf_counter() - started
+    report["elapsed_seconds"] = round(elapsed, 3)
+    report["rows_per_second"] = round(report["rows"] / elapsed, 1) if elapsed else None
+    report["errors_truncated"] = report["failed"] > len(report["errors"])
+    return report
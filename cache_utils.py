@@ -0,0 +1,118 @@
+# cache_utils.py
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def approx_size(obj, _seen=None):
+    """Rough deep size of an object in bytes, good enough for a cache budget."""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(k, _seen) + approx_size(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approx_size(item, _seen) for item in obj)
+    return size
+
+
+class LRUTTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after `ttl` seconds.
+    Bounded both by number of entries and by the approximate size in bytes
+    of the stored values. Keeps hit/miss/eviction counters.
+    `on_evict(key)` is called, outside the lock, for every entry dropped by LRU
+    eviction or expiry (not for delete/clear).
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=16 * 2**20, ttl=300, sizeof=approx_size, on_evict=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+        self._data = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return default
+            value, expires_at, _ = entry
+            expired = expires_at is not None and expires_at <= time.monotonic()
+            if expired:
+                self._remove(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+            else:
+                self._data.move_to_end(key)
+                self._stats["hits"] += 1
+        if expired:
+            self._evicted([key])
+            return default
+        return value
+
+    def set(self, key, value, ttl=None):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return False
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+
+        evicted = []
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+                evicted.append(oldest)
+        self._evicted(evicted)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def _evicted(self, keys):
+        if self.on_evict:
+            for key in keys:
+                self.on_evict(key)
+
+    def __contains__(self, key):
+        # Presence only: an expired entry still counts until it is read or evicted
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._data)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0
+        return stats
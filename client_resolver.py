@@ -0,0 +1,171 @@
+# client_resolver.py
+import argparse
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+from pymongo import MongoClient, UpdateOne
+
+FUZZY_MIN_SCORE = 0.3
+# Trigrams shared by more names than this carry little signal; skipping them bounds the work per lookup
+MAX_POSTINGS = 5000
+INDEX_TTL = 300
+
+
+def normalize_name(name):
+    """Lowercase, accents stripped, punctuation dropped, single spaces: 'Ravi  Mehta.' -> 'ravi mehta'."""
+    text = unicodedata.normalize("NFKD", name or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+def trigrams(normalized):
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ClientNameIndex:
+    """
+    In-memory trigram index over client names for fuzzy lookups ("Ravi Meta"
+    -> "Ravi Mehta"). Rebuilt from a name-only projection when marked stale
+    by a client write or after INDEX_TTL seconds.
+    """
+
+    def __init__(self, ttl=INDEX_TTL):
+        self.ttl = ttl
+        self._ids_by_name = {}
+        self._display_names = {}
+        self._names_by_trigram = defaultdict(set)
+        self._trigram_counts = {}
+        self._loaded_at = None
+        self._stale = True
+        self._lock = threading.Lock()
+        # Single flight: at most one rebuild (full clients scan) at a time
+        self._refresh_lock = threading.Lock()
+
+    def mark_stale(self):
+        self._stale = True
+
+    def refresh(self, db):
+        with self._refresh_lock:
+            self._rebuild(db)
+
+    def _rebuild(self, db):
+        # Cleared before the scan, so a client write during the rebuild marks it stale again
+        self._stale = False
+        ids_by_name = defaultdict(list)
+        display_names = {}
+        for doc in db.clients.find({}, {"name": 1}):
+            normalized = normalize_name(doc.get("name"))
+            if normalized:
+                ids_by_name[normalized].append(doc["_id"])
+                display_names.setdefault(normalized, doc["name"])
+
+        names_by_trigram = defaultdict(set)
+        for normalized in ids_by_name:
+            for gram in trigrams(normalized):
+                names_by_trigram[gram].add(normalized)
+
+        with self._lock:
+            self._ids_by_name = dict(ids_by_name)
+            self._display_names = display_names
+            self._names_by_trigram = names_by_trigram
+            self._trigram_counts = {n: len(trigrams(n)) for n in ids_by_name}
+            self._loaded_at = time.monotonic()
+        print(f"[DEBUG] Client name index rebuilt with {len(ids_by_name)} names")
+
+    def _needs_refresh(self):
+        return self._stale or self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def _background_rebuild(self, db):
+        try:
+            self._rebuild(db)
+        except Exception as e:
+            print(f"[ERROR] Client name index rebuild failed: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    def _ensure_fresh(self, db):
+        if not self._needs_refresh():
+            return
+        if self._loaded_at is None:
+            # Nothing to serve yet: the first caller builds, concurrent callers wait for it
+            with self._refresh_lock:
+                if self._loaded_at is None:
+                    self._rebuild(db)
+            return
+        # Stale or expired: rebuild in the background while the old index keeps serving
+        if self._refresh_lock.acquire(blocking=False):
+            if self._needs_refresh():
+                threading.Thread(target=self._background_rebuild, args=(db,), name="client-name-index", daemon=True).start()
+            else:
+                self._refresh_lock.release()
+
+    def best_names(self, db, name, limit=5, min_score=FUZZY_MIN_SCORE):
+        """Ranked distinct names [{"name", "ids", "score"}] by trigram Jaccard similarity."""
+        self._ensure_fresh(db)
+        query = trigrams(normalize_name(name))
+        if not query:
+            return []
+
+        with self._lock:
+            shared = defaultdict(int)
+            for gram in query:
+                postings = self._names_by_trigram.get(gram, ())
+                if len(postings) > MAX_POSTINGS:
+                    continue
+                for normalized in postings:
+                    shared[normalized] += 1
+
+            scored = (
+                (count / (len(query) + self._trigram_counts[normalized] - count), normalized)
+                for normalized, count in shared.items()
+            )
+            best = heapq.nlargest(limit, (item for item in scored if item[0] >= min_score))
+            return [
+                {"name": self._display_names[normalized], "ids": list(self._ids_by_name[normalized]), "score": round(score, 3)}
+                for score, normalized in best
+            ]
+
+    def candidates(self, db, name, limit=5, min_score=FUZZY_MIN_SCORE):
+        """Ranked [{"id", "name", "score"}], one entry per client."""
+        return [
+            {"id": client_id, "name": match["name"], "score": match["score"]}
+            for match in self.best_names(db, name, limit, min_score)
+            for client_id in match["ids"]
+        ][:limit]
+
+
+client_name_index = ClientNameIndex()
+
+
+def backfill_normalized_names(db, batch_size=1000):
+    """Set name_normalized on clients written before the field existed."""
+    updated, ops = 0, []
+    for doc in db.clients.find({"name_normalized": {"$exists": False}}, {"name": 1}):
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"name_normalized": normalize_name(doc.get("name"))}}))
+        if len(ops) >= batch_size:
+            updated += db.clients.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += db.clients.bulk_write(ops, ordered=False).modified_count
+    client_name_index.mark_stale()
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Client name resolution maintenance")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="fitnessDB")
+    parser.add_argument("--backfill", action="store_true", help="add name_normalized to existing clients")
+    parser.add_argument("--lookup", help="show fuzzy candidates for a name")
+    args = parser.parse_args()
+
+    db = MongoClient(args.uri)[args.db]
+    if args.backfill:
+        print(f"Backfilled name_normalized on {backfill_normalized_names(db)} clients")
+    if args.lookup:
+        print(client_name_index.candidates(db, args.lookup))
@@ -0,0 +1,102 @@
+# crew_pool.py
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+CREW_POOL_SIZE = int(os.getenv("CREW_POOL_SIZE", "2"))
+CREW_POOL_TIMEOUT = float(os.getenv("CREW_POOL_TIMEOUT", "30"))
+
+
+class PoolExhausted(Exception):
+    """Raised when no crew became free within the checkout timeout."""
+
+
+class CrewPool:
+    """
+    Bounded pool of pre-built crews. Each request checks one out, runs its
+    task and gives it back, so concurrent requests never share an agent and
+    nothing is rebuilt per request. Crews are built on demand up to `size`.
+    """
+
+    def __init__(self, name, factory, size=CREW_POOL_SIZE, timeout=CREW_POOL_TIMEOUT):
+        self.name = name
+        self.factory = factory
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "checkouts": 0,
+            "rejected": 0,
+            "in_use": 0,
+            "waiting": 0,
+            "wait_total_ms": 0.0,
+            "wait_max_ms": 0.0,
+        }
+
+    def _try_build(self):
+        with self._lock:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            print(f"[DEBUG] Building crew {self._created}/{self.size} for pool '{self.name}'")
+            return self.factory()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _acquire(self, timeout):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        crew = self._try_build()
+        if crew is not None:
+            return crew
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise PoolExhausted(f"No {self.name} crew available after {timeout}s")
+
+    def _update(self, **changes):
+        with self._lock:
+            for key, delta in changes.items():
+                self._stats[key] += delta
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.perf_counter()
+        self._update(waiting=1)
+        try:
+            crew = self._acquire(timeout)
+        except PoolExhausted:
+            self._update(waiting=-1, rejected=1)
+            raise
+        except Exception:
+            self._update(waiting=-1)
+            raise
+
+        waited_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats["waiting"] -= 1
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["wait_total_ms"] += waited_ms
+            self._stats["wait_max_ms"] = max(self._stats["wait_max_ms"], waited_ms)
+        try:
+            yield crew
+        finally:
+            self._update(in_use=-1)
+            self._idle.put(crew)
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats, size=self.size, created=self._created)
+        stats["avg_wait_ms"] = round(stats["wait_total_ms"] / stats["checkouts"], 2) if stats["checkouts"] else 0
+        return stats
@@ -0,0 +1,115 @@
+# dates.py
+# Date fields used to be stored as "YYYY-MM-DD" strings, which no range query
+# or index can use. They are now BSON dates; this migrates the old documents.
+import argparse
+import json
+from datetime import date, datetime, timedelta
+
+from pymongo import MongoClient
+
+MONGO_URI = "mongodb://localhost:27017"
+DB_NAME = "fitnessDB"
+
+DATE_FIELDS = {
+    "clients": ["birthdate", "joined_on"],
+    "orders": ["created_on"],
+    "payments": ["payment_date"],
+    "enquiries": ["created_on"],
+}
+
+
+def to_datetime(value):
+    """datetime for a date, datetime or ISO string ("2024-03-05"); None stays None."""
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(str(value).strip())
+
+
+def format_date(value):
+    # Plain "YYYY-MM-DD" for tool output, whether or not the document has been migrated yet
+    return value.strftime("%Y-%m-%d") if isinstance(value, datetime) else value
+
+
+def month_range(year, month=None):
+    """[start, end) datetimes covering a month, or the whole year when month is None."""
+    if month is None:
+        return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
+def date_window(start=None, end=None):
+    """Range filter for optional ISO start/end dates, both inclusive; None when neither is given."""
+    window = {}
+    if start:
+        window["$gte"] = to_datetime(start)
+    if end:
+        window["$lt"] = to_datetime(end) + timedelta(days=1)
+    return window or None
+
+
+def birth_md(birthdate):
+    """month * 100 + day ("1994-03-07" -> 307), the indexed key for birthday windows."""
+    dt = to_datetime(birthdate)
+    return dt.month * 100 + dt.day if dt else None
+
+
+def birth_md_ranges(start, days):
+    """Inclusive birth_md ranges covering `days` days from `start`; two when the window crosses New Year."""
+    first, last = birth_md(start), birth_md(start + timedelta(days=days))
+    if first <= last:
+        return [(first, last)]
+    return [(first, 1231), (101, last)]
+
+
+def string_date_counts(db):
+    return {
+        f"{collection}.{field}": db[collection].count_documents({field: {"$type": "string"}})
+        for collection, fields in DATE_FIELDS.items()
+        for field in fields
+    }
+
+
+def migrate_string_dates(db):
+    """
+    Convert string date fields in place with a server-side pipeline update.
+    Unparsable values are left as strings so they show up in the --check report.
+    """
+    results = {}
+    for collection, fields in DATE_FIELDS.items():
+        for field in fields:
+            result = db[collection].update_many(
+                {field: {"$type": "string"}},
+                [{"$set": {field: {"$dateFromString": {"dateString": f"${field}", "onError": f"${field}"}}}}],
+            )
+            results[f"{collection}.{field}"] = result.modified_count
+    return results
+
+
+def backfill_birth_md(db):
+    """Set birth_md on clients whose birthdate is a date but which predate the field."""
+    result = db.clients.update_many(
+        {"birthdate": {"$type": "date"}, "birth_md": {"$exists": False}},
+        [{"$set": {"birth_md": {"$add": [
+            {"$multiply": [{"$month": "$birthdate"}, 100]},
+            {"$dayOfMonth": "$birthdate"},
+        ]}}}],
+    )
+    return result.modified_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate string date fields to BSON dates")
+    parser.add_argument("--uri", default=MONGO_URI)
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--check", action="store_true", help="only count fields still stored as strings")
+    args = parser.parse_args()
+
+    db = MongoClient(args.uri)[args.db]
+    if not args.check:
+        print(json.dumps({"converted": migrate_string_dates(db)}, indent=2))
+        print(json.dumps({"birth_md_backfilled": backfill_birth_md(db)}, indent=2))
+    print(json.dumps({"still_strings": string_date_counts(db)}, indent=2))
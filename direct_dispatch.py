@@ -0,0 +1,69 @@
+# direct_dispatch.py
+import os
+
+from events import emit
+
+
+class _KeepMissing(dict):
+    # Leaves unknown placeholders as "Unknown" instead of raising KeyError
+    def __missing__(self, key):
+        return "Unknown"
+
+
+def direct_intents(env_var, intent_map):
+    """
+    Intents allowed to skip the crew and call their tool directly. The env var
+    is "all" (default), "none", or a comma separated list of intents; only
+    intents whose mapping declares "direct_args" can be dispatched directly.
+    """
+    supported = {intent for intent, mapping in intent_map.items() if "direct_args" in mapping}
+    selection = os.getenv(env_var, "all").strip()
+    if selection == "all":
+        return supported
+    if selection in ("", "none"):
+        return set()
+    return supported & {intent.strip() for intent in selection.split(",")}
+
+
+def _is_known(entities, key):
+    return entities.get(key) not in (None, "", "Unknown")
+
+
+def can_dispatch(mapping, entities):
+    # Each required entry is an entity key, or a tuple of keys of which one must be present
+    for required in mapping.get("required_entities", []):
+        keys = required if isinstance(required, tuple) else (required,)
+        if not any(_is_known(entities, key) for key in keys):
+            return False
+    return True
+
+
+def format_result(result, indent=""):
+    if isinstance(result, dict):
+        return "\n".join(
+            f"{indent}{key}:\n{format_result(value, indent + '  ')}" if isinstance(value, (dict, list))
+            else f"{indent}{key}: {value}"
+            for key, value in result.items()
+        )
+    if isinstance(result, list):
+        return "\n".join(
+            f"{indent}- " + ", ".join(f"{k}: {v}" for k, v in item.items()) if isinstance(item, dict)
+            else f"{indent}- {item}"
+            for item in result
+        )
+    return f"{indent}{result}"
+
+
+def dispatch(tool, mapping, entities):
+    """Call the tool with the extracted entities and render its output, no LLM involved."""
+    kwargs = {
+        arg: entities[key]
+        for arg, key in mapping["direct_args"].items()
+        if _is_known(entities, key)
+    }
+    print(f"[DEBUG] Direct dispatch to {tool.name} with {kwargs}")
+    emit("tool_start", {"tool": tool.name, "args": kwargs})
+    result = tool._run(**kwargs)
+    emit("tool_result", {"tool": tool.name, "result": result})
+    template = mapping.get("response_template", "{result}")
+    return template.format_map(_KeepMissing(entities, result=format_result(result)))
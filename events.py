@@ -0,0 +1,55 @@
+# events.py
+import contextvars
+
+# Progress events (intent, entities, tool calls, LLM tokens) for the request
+# being served on this thread. Nothing is emitted unless a sink is installed.
+_event_sink = contextvars.ContextVar("event_sink", default=None)
+
+
+def emit(event, data=None):
+    sink = _event_sink.get()
+    if sink is not None:
+        try:
+            sink(event, data)
+        except Exception as e:
+            print(f"[ERROR] Emitting '{event}' event failed: {e}")
+
+
+def streaming():
+    return _event_sink.get() is not None
+
+
+def run_with_sink(sink, fn, *args, **kwargs):
+    """Call fn with `sink` receiving every event emitted during the call."""
+    token = _event_sink.set(sink)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _event_sink.reset(token)
+
+
+def format_sse(event, data="", event_id=None):
+    # Multi-line payloads need one "data:" line per line
+    lines = str(data).split("\n")
+    header = f"id: {event_id}\n" if event_id is not None else ""
+    return header + f"event: {event}\n" + "".join(f"data: {line}\n" for line in lines) + "\n"
+
+
+def _register_crewai_listeners():
+    # Forward crewAI's tool usage events, they fire on the thread running the crew
+    try:
+        from crewai.utilities.events import ToolUsageFinishedEvent, ToolUsageStartedEvent, crewai_event_bus
+    except ImportError as e:
+        print(f"[DEBUG] crewAI event bus not available, tool events from crews are not streamed: {e}")
+        return
+
+    @crewai_event_bus.on(ToolUsageStartedEvent)
+    def on_tool_started(source, event):
+        emit("tool_start", {"tool": getattr(event, "tool_name", None), "args": getattr(event, "tool_args", None)})
+
+    @crewai_event_bus.on(ToolUsageFinishedEvent)
+    def on_tool_finished(source, event):
+        emit("tool_result", {"tool": getattr(event, "tool_name", None), "result": getattr(event, "output", None)})
+
+
+_register_crewai_listeners()
@@ -0,0 +1,29 @@
+# executors.py
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from crew_pool import CREW_POOL_SIZE
+
+# Separate pools so slow crew runs cannot starve model inference, and neither
+# of them can starve the event loop that serves the light CRUD endpoints.
+# Inference threads mostly wait on the micro-batcher, so more of them is cheap.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "8"))
+CREW_WORKERS = int(os.getenv("CREW_WORKERS", str(CREW_POOL_SIZE * 2)))
+
+inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+crew_executor = ThreadPoolExecutor(max_workers=CREW_WORKERS, thread_name_prefix="crew")
+
+
+async def run_in(executor, fn, *args, **kwargs):
+    """Run a blocking call on the given executor, keeping the caller's context variables."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(ctx.run, fn, *args, **kwargs))
+
+
+def shutdown():
+    inference_executor.shutdown(wait=False, cancel_futures=True)
+    crew_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,94 @@
+# indexes.py
+import argparse
+import json
+
+from pymongo import ASCENDING, MongoClient
+from pymongo.errors import OperationFailure
+
+MONGO_URI = "mongodb://localhost:27017"
+DB_NAME = "fitnessDB"
+
+# Case-insensitive comparison, used by the client name index and the queries that rely on it
+CASE_INSENSITIVE = {"locale": "en", "strength": 2}
+
+# Indexes the MongoDBTool queries need, per collection: (name, keys, options)
+INDEX_SPECS = {
+    "clients": [
+        ("name_ci", [("name", ASCENDING)], {"collation": CASE_INSENSITIVE}),
+        ("name_normalized", [("name_normalized", ASCENDING)], {}),
+        # Partial so clients without an email/phone do not collide on null
+        ("email_unique", [("email", ASCENDING)], {"unique": True, "partialFilterExpression": {"email": {"$type": "string"}}}),
+        ("phone_unique", [("phone", ASCENDING)], {"unique": True, "partialFilterExpression": {"phone": {"$type": "string"}}}),
+        ("status", [("status", ASCENDING)], {}),
+        ("joined_on", [("joined_on", ASCENDING)], {}),
+        ("birth_md", [("birth_md", ASCENDING)], {}),
+    ],
+    "orders": [
+        ("client_id", [("client_id", ASCENDING)], {}),
+        ("status", [("status", ASCENDING)], {}),
+        ("service_name", [("service_name", ASCENDING)], {}),
+        ("created_on", [("created_on", ASCENDING)], {}),
+    ],
+    "classes": [
+        ("instructor", [("instructor", ASCENDING)], {}),
+        ("status", [("status", ASCENDING)], {}),
+    ],
+    "attendance": [
+        ("class_id", [("class_id", ASCENDING)], {}),
+        ("date", [("date", ASCENDING)], {}),
+    ],
+    "payments": [
+        ("order_id", [("order_id", ASCENDING)], {}),
+        ("payment_date", [("payment_date", ASCENDING)], {}),
+    ],
+}
+
+
+def ensure_indexes(db):
+    """Create every declared index; already existing ones are a no-op. Returns per-index results."""
+    results = {}
+    for collection, specs in INDEX_SPECS.items():
+        for name, keys, options in specs:
+            try:
+                db[collection].create_index(keys, name=name, **options)
+                results[f"{collection}.{name}"] = "ok"
+            except OperationFailure as e:
+                # e.g. duplicate emails blocking a unique index, or a conflicting old definition
+                results[f"{collection}.{name}"] = f"failed: {e.details.get('errmsg', e) if e.details else e}"
+                print(f"[ERROR] Index {collection}.{name} could not be created: {e}")
+    return results
+
+
+def index_report(db):
+    """Missing declared indexes, indexes nobody declared, and indexes with no recorded use."""
+    report = {}
+    for collection, specs in INDEX_SPECS.items():
+        declared = {name for name, _, _ in specs}
+        existing = set(db[collection].index_information()) - {"_id_"}
+        try:
+            usage = {
+                stat["name"]: stat["accesses"]["ops"]
+                for stat in db[collection].aggregate([{"$indexStats": {}}])
+            }
+        except OperationFailure:
+            usage = {}
+        report[collection] = {
+            "missing": sorted(declared - existing),
+            "undeclared": sorted(existing - declared),
+            # ops counters reset on server restart, so "unused" means unused since then
+            "unused": sorted(name for name in existing if usage.get(name) == 0),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create and check the fitnessDB indexes")
+    parser.add_argument("--uri", default=MONGO_URI)
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--check", action="store_true", help="only report, do not create anything")
+    args = parser.parse_args()
+
+    db = MongoClient(args.uri)[args.db]
+    if not args.check:
+        print(json.dumps(ensure_indexes(db), indent=2))
+    print(json.dumps(index_report(db), indent=2))
@@ -0,0 +1,107 @@
+# inference_batcher.py
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+BATCH_MAX_SIZE = int(os.getenv("INFERENCE_BATCH_MAX_SIZE", "16"))
+BATCH_WINDOW_MS = float(os.getenv("INFERENCE_BATCH_WINDOW_MS", "5"))
+
+
+class MicroBatcher:
+    """
+    Collects requests from concurrent callers and runs them through `batch_fn`
+    together. A batch is flushed when it reaches `max_batch_size` or when the
+    oldest request has waited `max_wait_ms`. `batch_fn` takes a list of items
+    and returns a list of results in the same order.
+    """
+
+    def __init__(self, name, batch_fn, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_WINDOW_MS):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "batches": 0,
+            "batch_sizes": {},
+            "queue_wait_total_ms": 0.0,
+            "queue_wait_max_ms": 0.0,
+            "batch_run_total_ms": 0.0,
+        }
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=f"batcher-{self.name}", daemon=True)
+                self._worker.start()
+
+    def submit(self, item):
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def __call__(self, item):
+        return self.submit(item).result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            items = [item for item, _, _ in batch]
+            try:
+                results = list(self.batch_fn(items))
+                if len(results) != len(batch):
+                    # zip() would silently leave the extra callers waiting forever
+                    raise RuntimeError(f"{self.name} returned {len(results)} results for {len(batch)} inputs")
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                print(f"[ERROR] {self.name} batch of {len(batch)} failed: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            self._record(batch, started)
+
+    def _record(self, batch, started):
+        finished = time.perf_counter()
+        waits = [(started - enqueued) * 1000 for _, _, enqueued in batch]
+        with self._stats_lock:
+            stats = self._stats
+            stats["requests"] += len(batch)
+            stats["batches"] += 1
+            stats["batch_sizes"][len(batch)] = stats["batch_sizes"].get(len(batch), 0) + 1
+            stats["queue_wait_total_ms"] += sum(waits)
+            stats["queue_wait_max_ms"] = max(stats["queue_wait_max_ms"], max(waits))
+            stats["batch_run_total_ms"] += (finished - started) * 1000
+
+    def metrics(self):
+        with self._stats_lock:
+            stats = dict(self._stats, batch_sizes=dict(self._stats["batch_sizes"]))
+        requests, batches = stats["requests"], stats["batches"]
+        stats["avg_batch_size"] = round(requests / batches, 2) if batches else 0
+        stats["avg_queue_wait_ms"] = round(stats["queue_wait_total_ms"] / requests, 2) if requests else 0
+        stats["avg_batch_run_ms"] = round(stats["batch_run_total_ms"] / batches, 2) if batches else 0
+        stats["pending"] = self._queue.qsize()
+        return stats
@@ -0,0 +1,178 @@
+# intent_backends.py
+import os
+import threading
+
+import numpy as np
+import torch
+from transformers import AutoModel, AutoTokenizer
+
+from onnx_backend import build_pipeline
+
+INTENT_BACKEND = os.getenv("INTENT_BACKEND", "embedding")
+ZERO_SHOT_MODEL = os.getenv("INTENT_ZERO_SHOT_MODEL", "facebook/bart-large-mnli")
+EMBEDDING_MODEL = os.getenv("INTENT_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_TEMPERATURE = float(os.getenv("INTENT_EMBEDDING_TEMPERATURE", "0.05"))
+
+# Example phrasings per intent. Adding an intent only adds rows to the cached
+# label matrix, the query is still encoded exactly once.
+INTENT_EXEMPLARS = {
+    # Support agent
+    "create_order": [
+        "Create an order for Varda Kannal for Strength Training",
+        "Book Yoga Beginner for Ravi Mehta",
+        "Sign up a client for a service",
+    ],
+    "create_enquiry": [
+        "Create an enquiry for XYZ with email xyz@gmail.com for Pilates Intermediate",
+        "Log an enquiry from a new lead with their phone number",
+        "Someone is interested in joining, note their contact details",
+    ],
+    "list_upcoming_classes": [
+        "List upcoming classes",
+        "Which classes are coming up",
+        "Show the class schedule",
+    ],
+    "get_client_info": [
+        "Get client info for Priya Sharma",
+        "Show the details of the client with this email",
+        "Look up a member by phone number",
+    ],
+    "get_client_services": [
+        "Fetch client services for Ravi Mehta",
+        "Which services is this client enrolled in",
+        "What has the client signed up for",
+    ],
+    "filter_classes_by_instructor": [
+        "Fetch all the courses by instructor Vikram Singh",
+        "Which classes does this trainer teach",
+        "Show classes taught by an instructor",
+    ],
+    "filter_classes_by_status": [
+        "Fetch all the courses with Scheduled status",
+        "Show completed classes",
+        "List canceled classes",
+    ],
+    # Dashboard agent
+    "get_revenue_metrics": [
+        "What was the total revenue for month January of the year 2025",
+        "How much money did we make this year",
+        "Show revenue metrics",
+    ],
+    "get_outstanding_payment": [
+        "Retrieve total outstanding payment till now",
+        "How much is still pending to be paid",
+        "Show unpaid dues",
+    ],
+    "get_active_inactive_client_insights": [
+        "Get active and inactive client counts",
+        "How many members are active",
+        "How many clients are inactive",
+    ],
+    "get_client_birthday_reminder": [
+        "Can you retrieve clients with birthdays coming up soon?",
+        "Whose birthday is next month",
+        "Birthday reminders for clients",
+    ],
+    "get_new_clients_this_month": [
+        "Fetch clients that joined in the last month",
+        "Who are the new members this month",
+        "How many clients signed up recently",
+    ],
+    "get_service_analytics": [
+        "Fetch service analytics",
+        "Which services are most popular",
+        "Show enrollment trends and completion rates",
+    ],
+    "get_attendance_report": [
+        "Fetch attendance report",
+        "Fetch attendance report for class_7",
+        "What is the drop-off rate of classes",
+    ],
+}
+
+
+class ZeroShotIntentBackend:
+    """Zero-shot NLI classification, one forward pass per candidate label."""
+
+    def __init__(self, model_name=ZERO_SHOT_MODEL):
+        self.classifier = build_pipeline("zero-shot-classification", model_name)
+
+    def __call__(self, query, labels):
+        # A batch from the MicroBatcher goes through in one padded forward pass
+        if isinstance(query, list):
+            return self.classifier(query, labels, batch_size=len(query))
+        return self.classifier(query, labels)
+
+
+class EmbeddingIntentBackend:
+    """
+    Encodes the query once and scores it against precomputed label embeddings.
+    Each label is represented by its name plus its exemplars; a label's score is
+    its best cosine similarity, softmaxed over the candidate labels so the
+    result has the same shape as the zero-shot pipeline output.
+    """
+
+    def __init__(self, model_name=EMBEDDING_MODEL, exemplars=None, temperature=EMBEDDING_TEMPERATURE):
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModel.from_pretrained(model_name)
+        self.model.eval()
+        self.exemplars = exemplars or INTENT_EXEMPLARS
+        self.temperature = temperature
+        self._label_cache = {}
+        self._lock = threading.Lock()
+
+    def encode(self, texts):
+        batch = self.tokenizer(texts, padding=True, truncation=True, return_tensors="pt")
+        with torch.inference_mode():
+            hidden = self.model(**batch).last_hidden_state
+        mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+        return torch.nn.functional.normalize(pooled, dim=-1).numpy()
+
+    def _label_matrix(self, labels):
+        key = tuple(labels)
+        cached = self._label_cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            if key not in self._label_cache:
+                texts, offsets = [], []
+                for label in labels:
+                    offsets.append(len(texts))
+                    texts.append(label.replace("_", " "))
+                    texts.extend(self.exemplars.get(label, []))
+                self._label_cache[key] = (self.encode(texts), np.array(offsets))
+        return self._label_cache[key]
+
+    def __call__(self, query, labels):
+        queries = [query] if isinstance(query, str) else list(query)
+        matrix, offsets = self._label_matrix(labels)
+
+        sims = self.encode(queries) @ matrix.T
+        label_sims = np.maximum.reduceat(sims, offsets, axis=1) / self.temperature
+        probs = np.exp(label_sims - label_sims.max(axis=1, keepdims=True))
+        probs /= probs.sum(axis=1, keepdims=True)
+
+        results = []
+        for text, row in zip(queries, probs):
+            order = np.argsort(-row)
+            results.append({
+                "sequence": text,
+                "labels": [labels[i] for i in order],
+                "scores": [float(row[i]) for i in order],
+            })
+        return results[0] if isinstance(query, str) else results
+
+
+INTENT_BACKENDS = {
+    "zero_shot": ZeroShotIntentBackend,
+    "embedding": EmbeddingIntentBackend,
+}
+
+
+def get_intent_backend(name=INTENT_BACKEND):
+    if name not in INTENT_BACKENDS:
+        raise ValueError(f"❌ Unknown intent backend: {name}")
+    print(f"[DEBUG] Loading intent backend: {name}")
+    return INTENT_BACKENDS[name]()
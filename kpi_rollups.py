@@ -0,0 +1,192 @@
+# kpi_rollups.py
+# Precomputed dashboard KPIs in the kpi_rollups collection: revenue per month,
+# the outstanding (pending orders) total and client status counts. Writes in
+# services.py apply $inc updates; reconcile() recomputes everything from the
+# source collections and is run periodically to repair any drift.
+import argparse
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+from pymongo import MongoClient, ReplaceOne, UpdateOne
+
+MONGO_URI = "mongodb://localhost:27017"
+DB_NAME = "fitnessDB"
+COLLECTION = "kpi_rollups"
+
+# Seconds between background reconciliations; 0 disables the job
+KPI_RECONCILE_INTERVAL = int(os.getenv("KPI_RECONCILE_INTERVAL", "900"))
+
+# Collections whose bulk loads require a reconcile afterwards
+SOURCE_COLLECTIONS = {"clients", "orders", "payments"}
+
+REVENUE_PIPELINE = [
+    {"$match": {"payment_date": {"$type": "date"}}},
+    {"$group": {
+        "_id": {"year": {"$year": "$payment_date"}, "month": {"$month": "$payment_date"}},
+        "total": {"$sum": "$amount_paid"},
+        "payments": {"$sum": 1},
+    }},
+]
+OUTSTANDING_PIPELINE = [
+    {"$match": {"status": "pending"}},
+    {"$group": {"_id": None, "total": {"$sum": "$amount"}, "orders": {"$sum": 1}}},
+]
+STATUS_PIPELINE = [
+    {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+]
+
+
+def revenue_id(year, month):
+    return f"revenue:{year}-{month:02d}"
+
+
+# --- Incremental updates, applied by the write paths in services.py ---
+def order_created_ops(order):
+    if order.get("status") != "pending":
+        return []
+    return [UpdateOne({"_id": "outstanding"}, {"$inc": {"total": order["amount"], "orders": 1}}, upsert=True)]
+
+def order_paid_ops(order):
+    return [UpdateOne({"_id": "outstanding"}, {"$inc": {"total": -order["amount"], "orders": -1}}, upsert=True)]
+
+def payment_ops(payment):
+    paid_on = payment["payment_date"]
+    return [UpdateOne(
+        {"_id": revenue_id(paid_on.year, paid_on.month)},
+        {
+            "$inc": {"total": payment["amount_paid"], "payments": 1},
+            "$setOnInsert": {"kind": "revenue", "year": paid_on.year, "month": paid_on.month},
+        },
+        upsert=True,
+    )]
+
+def client_status_ops(old_status, new_status):
+    if old_status == new_status:
+        return []
+    inc = {new_status: 1}
+    if old_status:
+        inc[old_status] = -1
+    return [UpdateOne({"_id": "client_status"}, {"$inc": inc}, upsert=True)]
+
+
+def apply(db, ops):
+    # A failed rollup update must not fail the write itself; the next reconcile repairs it
+    if not ops:
+        return
+    try:
+        db[COLLECTION].bulk_write(ops, ordered=False)
+    except Exception as e:
+        print(f"[ERROR] KPI rollup update failed, waiting for reconcile: {e}")
+
+async def aapply(db, ops):
+    if not ops:
+        return
+    try:
+        await db[COLLECTION].bulk_write(ops, ordered=False)
+    except Exception as e:
+        print(f"[ERROR] KPI rollup update failed, waiting for reconcile: {e}")
+
+
+# --- Full recompute ---
+def _rollup_documents(revenue_rows, outstanding_rows, status_rows):
+    docs = [
+        {
+            "_id": revenue_id(row["_id"]["year"], row["_id"]["month"]),
+            "kind": "revenue",
+            "year": row["_id"]["year"],
+            "month": row["_id"]["month"],
+            "total": row["total"],
+            "payments": row["payments"],
+        }
+        for row in revenue_rows
+    ]
+    outstanding = outstanding_rows[0] if outstanding_rows else {"total": 0, "orders": 0}
+    docs.append({"_id": "outstanding", "total": outstanding["total"], "orders": outstanding["orders"]})
+    counts = {"active": 0, "inactive": 0}
+    counts.update({row["_id"]: row["count"] for row in status_rows if row["_id"]})
+    docs.append({"_id": "client_status", **counts})
+    docs.append({"_id": "meta", "reconciled_at": datetime.now(timezone.utc)})
+    return docs
+
+def _reconcile_ops(docs):
+    ops = [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs]
+    stale_filter = {"kind": "revenue", "_id": {"$nin": [doc["_id"] for doc in docs]}}
+    return ops, stale_filter
+
+def reconcile(db):
+    """
+    Recompute every rollup from payments, orders and clients. Increments that
+    land while this runs can be overwritten; the next run picks them up.
+    """
+    docs = _rollup_documents(
+        list(db.payments.aggregate(REVENUE_PIPELINE)),
+        list(db.orders.aggregate(OUTSTANDING_PIPELINE)),
+        list(db.clients.aggregate(STATUS_PIPELINE)),
+    )
+    ops, stale_filter = _reconcile_ops(docs)
+    db[COLLECTION].bulk_write(ops, ordered=False)
+    db[COLLECTION].delete_many(stale_filter)
+    print(f"[DEBUG] KPI rollups reconciled: {len(docs)} documents")
+    return docs
+
+async def areconcile(db):
+    docs = _rollup_documents(
+        await (await db.payments.aggregate(REVENUE_PIPELINE)).to_list(None),
+        await (await db.orders.aggregate(OUTSTANDING_PIPELINE)).to_list(None),
+        await (await db.clients.aggregate(STATUS_PIPELINE)).to_list(None),
+    )
+    ops, stale_filter = _reconcile_ops(docs)
+    await db[COLLECTION].bulk_write(ops, ordered=False)
+    await db[COLLECTION].delete_many(stale_filter)
+    print(f"[DEBUG] KPI rollups reconciled: {len(docs)} documents")
+    return docs
+
+
+# --- Reads ---
+def _read_filter(ids):
+    return {"_id": {"$in": [*ids, "meta"]}} if ids else {}
+
+def read_rollups(db, ids=None):
+    """Rollup documents by _id (all, or just `ids`) in one query, or None if they were never reconciled."""
+    rollups = {doc["_id"]: doc for doc in db[COLLECTION].find(_read_filter(ids))}
+    return rollups if "meta" in rollups else None
+
+def revenue_total(rollups, year=None, month=None):
+    return sum(
+        doc["total"] for doc in rollups.values()
+        if doc.get("kind") == "revenue"
+        and (year is None or doc["year"] == year)
+        and (month is None or doc["month"] == month)
+    )
+
+
+def start_reconcile_thread(interval=KPI_RECONCILE_INTERVAL):
+    """Reconcile now and then every `interval` seconds. Returns an Event that stops the thread."""
+    stop = threading.Event()
+    if interval <= 0:
+        return stop
+
+    def run():
+        with MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000) as client:
+            while True:
+                try:
+                    reconcile(client[DB_NAME])
+                except Exception as e:
+                    print(f"[ERROR] KPI rollup reconcile failed: {e}")
+                if stop.wait(interval):
+                    return
+
+    threading.Thread(target=run, name="kpi-reconcile", daemon=True).start()
+    return stop
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute the dashboard KPI rollups")
+    parser.add_argument("--uri", default=MONGO_URI)
+    parser.add_argument("--db", default=DB_NAME)
+    args = parser.parse_args()
+
+    docs = reconcile(MongoClient(args.uri)[args.db])
+    print(json.dumps(docs, indent=2, default=str))
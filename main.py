@@ -1,30 +1,127 @@
 # main.py
 
-from fastapi import FastAPI, Form, HTTPException, Request
-from fastapi.responses import HTMLResponse
+import asyncio
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel
-from pymongo import MongoClient
-from datetime import datetime, timezone
+from pymongo import AsyncMongoClient, MongoClient
 from bson import ObjectId
+from markupsafe import escape
 
-from DashboardAgent import run_dashboard_agent
-from SupportAgent import run_support_agent
-
-app = FastAPI()
+import bulk_import
+import events
+import indexes
+import kpi_rollups
+import services
+import snapshot
+from answer_cache import answer_cache
+import executors
+from agent_logic import inference_metrics, models_ready, parse_query_dashboard, parse_query_support, warm_up_models
+from crew_pool import PoolExhausted
+from DashboardAgent import dashboard_crew_pool, run_dashboard_agent
+from SupportAgent import run_support_agent, support_crew_pool
+from model_registry import registry
+from my_llm_wrapper import llm_metrics, ping_ollama, warm_up_ollama
+from services import ClientStatusUpdate, Enquiry, Order, Payment
 
-client = MongoClient("mongodb://127.0.0.1:27017")
+# Async driver, so the CRUD endpoints never block the event loop
+client = AsyncMongoClient("mongodb://127.0.0.1:27017", serverSelectionTimeoutMS=2000)
 db = client["fitnessDB"]
 
+ENSURE_INDEXES_ON_STARTUP = os.getenv("ENSURE_INDEXES_ON_STARTUP", "1") == "1"
+
+# Seconds between Ollama warm-up retries when it was not reachable at startup
+OLLAMA_WARM_UP_RETRY = float(os.getenv("OLLAMA_WARM_UP_RETRY", "15"))
+warm_up_stop = threading.Event()
+
+warm_up_state = {"started_at": None, "finished_at": None, "ollama_warmed": False, "indexes": None}
+
+async def ping_mongo():
+    try:
+        await client.admin.command("ping")
+        return True
+    except Exception as e:
+        print(f"[ERROR] MongoDB ping failed: {e}")
+        return False
+
+def warm_up():
+    # Runs in the background so /healthz answers while models load
+    warm_up_state["started_at"] = time.time()
+    if ENSURE_INDEXES_ON_STARTUP:
+        try:
+            with MongoClient(indexes.MONGO_URI, serverSelectionTimeoutMS=2000) as sync_client:
+                warm_up_state["indexes"] = indexes.ensure_indexes(sync_client[indexes.DB_NAME])
+        except Exception as e:
+            print(f"[ERROR] Index bootstrap failed: {e}")
+    warm_up_models()
+    warm_up_state["ollama_warmed"] = warm_up_ollama()
+    warm_up_state["finished_at"] = time.time()
+    print(f"[DEBUG] Warm-up finished in {warm_up_state['finished_at'] - warm_up_state['started_at']:.1f}s")
+    # Ollama may come up after the app; keep trying so /readyz can turn ready
+    while not warm_up_state["ollama_warmed"] and not warm_up_stop.wait(OLLAMA_WARM_UP_RETRY):
+        warm_up_state["ollama_warmed"] = warm_up_ollama()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    stop_reconcile = kpi_rollups.start_reconcile_thread()
+    yield
+    stop_reconcile.set()
+    warm_up_stop.set()
+    executors.shutdown()
+    await client.close()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.exception_handler(PoolExhausted)
+async def pool_exhausted_handler(request: Request, exc: PoolExhausted):
+    # Back-pressure: tell the client to retry instead of queueing forever
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
 templates = Jinja2Templates(directory="templates")
 
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    checks = {
+        "models": models_ready(),
+        "ollama": warm_up_state["ollama_warmed"] and await asyncio.to_thread(ping_ollama),
+        "mongodb": await ping_mongo(),
+    }
+    ready = all(checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not ready", "checks": checks, "models": registry.status()}
+    )
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "models": registry.status(),
+        "inference": inference_metrics(),
+        "answer_cache": answer_cache.stats(),
+        "llm": llm_metrics(),
+        "crew_pools": {"dashboard": dashboard_crew_pool.metrics(), "support": support_crew_pool.metrics()}
+    }
+
 @app.get("/", response_class=HTMLResponse)
-def home(request: Request):
+async def home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 @app.post("/dashboard", response_class=HTMLResponse)
-def dashboard_query(request: Request, query: str = Form(...)):
-    result = run_dashboard_agent(query)
+async def dashboard_query(request: Request, query: str = Form(...)):
+    # NLP parsing and the crew run on their own executors, off the event loop
+    parsed = await executors.run_in(executors.inference_executor, parse_query_dashboard, query)
+    result = await executors.run_in(executors.crew_executor, run_dashboard_agent, query, parsed)
     return templates.TemplateResponse("partials.html", {
         "request": request,
         "agent": "Dashboard Agent",
@@ -33,8 +130,9 @@ def dashboard_query(request: Request, query: str = Form(...)):
     })
 
 @app.post("/support", response_class=HTMLResponse)
-def support_query(request: Request, query: str = Form(...)):
-    result = run_support_agent(query)
+async def support_query(request: Request, query: str = Form(...)):
+    parsed = await executors.run_in(executors.inference_executor, parse_query_support, query)
+    result = await executors.run_in(executors.crew_executor, run_support_agent, query, parsed)
     return templates.TemplateResponse("partials.html", {
         "request": request,
         "agent": "Support Agent",
@@ -42,33 +140,147 @@ def support_query(request: Request, query: str = Form(...)):
         "response": result
     })
 
-class Enquiry(BaseModel):
-    name: str
-    email: str
-    phone: str
-    notes: str
+@app.get("/dashboard/snapshot")
+async def dashboard_snapshot(request: Request):
+    """All dashboard KPIs in one response: JSON, or an HTML partial for htmx requests."""
+    data = await snapshot.build_snapshot()
+    if request.headers.get("HX-Request"):
+        return templates.TemplateResponse("snapshot.html", {"request": request, "snapshot": data})
+    return data
+
+# === Streaming (Server-Sent Events) ===
+STREAMING_AGENTS = {
+    "dashboard": ("Dashboard Agent", parse_query_dashboard, run_dashboard_agent),
+    "support": ("Support Agent", parse_query_support, run_support_agent),
+}
+
+def render_event(event, data):
+    # Each event is swapped into templates/stream.html by the htmx SSE extension
+    if event == "entities":
+        return escape(", ".join(f"{k}: {v}" for k, v in data.items()) or "none")
+    if event == "tool_start":
+        return f"<li>🔧 Running {escape(data['tool'])}…</li>"
+    if event == "tool_result":
+        return f"<li>✅ {escape(data['tool'])} returned: {escape(str(data['result'])[:500])}</li>"
+    return escape(data)
 
-class Order(BaseModel):
-    client_id: str
-    service_name: str
-    amount: float
+# Finished runs are kept this long so a reconnecting EventSource can still replay them
+STREAM_RUN_TTL = 300
+stream_runs = {}
+
+class StreamRun:
+    """
+    One agent run started by POST /…/stream. The GET events endpoint only
+    replays and follows its events, so an EventSource reconnect resumes the
+    stream instead of running the query (and its writes) again.
+    """
+    def __init__(self, agent_key, query):
+        self.agent_key = agent_key
+        self.query = query
+        self.events = []
+        self.task = None  # keeps the background task referenced
+        self._waiter = asyncio.Event()
+
+    def add(self, event, data):
+        self.events.append((event, data))
+        waiter, self._waiter = self._waiter, asyncio.Event()
+        waiter.set()
+
+    async def wait_for_more(self, seen):
+        while len(self.events) <= seen:
+            await self._waiter.wait()
+
+async def execute_stream_run(run_id, run):
+    agent_name, parse_fn, run_fn = STREAMING_AGENTS[run.agent_key]
+    loop = asyncio.get_running_loop()
+
+    def sink(event, data):
+        # Called from executor threads
+        loop.call_soon_threadsafe(run.add, event, render_event(event, data))
+
+    try:
+        parsed = await executors.run_in(executors.inference_executor, parse_fn, run.query)
+        run.add("intent", render_event("intent", parsed["intent"]))
+        run.add("entities", render_event("entities", parsed.get("entities", {})))
+        response = await executors.run_in(executors.crew_executor, events.run_with_sink, sink, run_fn, run.query, parsed)
+    except Exception as e:
+        print(f"[ERROR] Streaming {run.agent_key} query failed: {e}")
+        response = f"❌ {e}"
+    run.add("done", templates.get_template("partials.html").render(agent=agent_name, query=run.query, response=response))
+    loop.call_later(STREAM_RUN_TTL, stream_runs.pop, run_id, None)
+
+async def agent_event_stream(run, last_event_id=0):
+    # Event ids are 1-based positions in run.events; Last-Event-ID resumes after the last one received
+    seen = last_event_id
+    yield ": connected\n\n"
+    while True:
+        await run.wait_for_more(seen)
+        for event, html in run.events[seen:]:
+            seen += 1
+            yield events.format_sse(event, html, event_id=seen)
+            if event == "done":
+                return
+
+@app.post("/dashboard/stream", response_class=HTMLResponse)
+@app.post("/support/stream", response_class=HTMLResponse)
+async def stream_query(request: Request, query: str = Form(...)):
+    agent_key = request.url.path.split("/")[1]
+    run_id = uuid.uuid4().hex
+    run = StreamRun(agent_key, query)
+    stream_runs[run_id] = run
+    run.task = asyncio.create_task(execute_stream_run(run_id, run))
+    return templates.TemplateResponse("stream.html", {
+        "request": request,
+        "agent": STREAMING_AGENTS[agent_key][0],
+        "query": query,
+        "events_url": f"/{agent_key}/events/{run_id}"
+    })
+
+@app.get("/dashboard/events/{run_id}")
+@app.get("/support/events/{run_id}")
+async def stream_events(request: Request, run_id: str):
+    run = stream_runs.get(run_id)
+    if run is None or run.agent_key != request.url.path.split("/")[1]:
+        # A non-200 response makes EventSource stop reconnecting
+        raise HTTPException(status_code=404, detail="Unknown or expired run")
+    last_event_id = request.headers.get("Last-Event-ID", "0")
+    return StreamingResponse(
+        agent_event_stream(run, int(last_event_id) if last_event_id.isdigit() else 0),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.post("/enquiry")
-def create_enquiry(enquiry: Enquiry):
-    data = enquiry.model_dump()
-    data["created_on"] = datetime.now(timezone.utc).date().isoformat()
-    result = db.enquiries.insert_one(data)
-    return {"status": "success", "enquiry_id": str(result.inserted_id)}
+async def create_enquiry(enquiry: Enquiry):
+    return await services.acreate_enquiry(db, enquiry)
 
 @app.post("/order")
-def create_order(order: Order):
-    # Optional: validate client_id exists
-    if not db.clients.find_one({"_id": order.client_id}):
+async def create_order(order: Order):
+    try:
+        return await services.acreate_order(db, order)
+    except services.ClientNotFound:
+        raise HTTPException(status_code=404, detail="Client not found")
+
+@app.post("/payment")
+async def record_payment(payment: Payment):
+    try:
+        return await services.arecord_payment(db, payment)
+    except services.OrderNotFound:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+@app.post("/client/{client_id}/status")
+async def update_client_status(client_id: str, update: ClientStatusUpdate):
+    try:
+        return await services.aupdate_client_status(db, client_id, update)
+    except services.ClientNotFound:
         raise HTTPException(status_code=404, detail="Client not found")
-    # print("[DEBUG] DB Name:", db.name)
 
-    data = order.model_dump()
-    data["status"] = "pending"
-    data["created_on"] = datetime.now(timezone.utc).date().isoformat()
-    result = db.orders.insert_one(data)
-    return {"status": "success", "order_id": str(result.inserted_id)}
\ No newline at end of file
+@app.post("/import/{collection}")
+async def import_collection(collection: str, file: UploadFile = File(...), format: str | None = None):
+    """Bulk load NDJSON or CSV rows into clients, orders, payments, attendance, enquiries or courses."""
+    if collection not in bulk_import.IMPORT_MODELS:
+        raise HTTPException(status_code=404, detail=f"Import not supported for '{collection}'")
+    fmt = format or ("csv" if (file.filename or "").lower().endswith(".csv") else "ndjson")
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'")
+    return await bulk_import.import_records(db, collection, file.file, fmt)
@@ -3,9 +3,17 @@ from datetime import datetime, timedelta, timezone
 import random
 import uuid
 
+from client_resolver import normalize_name
+from dates import birth_md
+from kpi_rollups import reconcile
+
 client = MongoClient("mongodb://localhost:27017")
 db = client["fitnessDB"]
 
+def random_date_2024():
+    # Stored as BSON dates so revenue/new-client queries can use range scans
+    return datetime(2024, random.randint(1, 12), random.randint(1, 28))
+
 # Drop old collections
 for col in ["clients", "courses", "classes", "orders", "payments", "attendance", "enquiries"]:
     db[col].drop()
@@ -19,14 +27,17 @@ for i in range(25):
     fname = random.choice(first_names)
     lname = random.choice(last_names)
     client_id = f"client_{str(i+1).zfill(3)}"
+    birthdate = datetime(1990 + random.randint(0, 9), random.randint(1, 12), random.randint(1, 28))
     clients.append({
         "_id": client_id,
         "name": f"{fname} {lname}",
+        "name_normalized": normalize_name(f"{fname} {lname}"),
         "email": f"{fname.lower()}{i}@example.com",
         "phone": f"98765{random.randint(10000, 99999)}",
-        "birthdate": f"199{random.randint(0,9)}-{random.randint(1,12):02d}-{random.randint(1,28):02d}",
+        "birthdate": birthdate,
+        "birth_md": birth_md(birthdate),
         "status": random.choice(["active", "inactive"]),
-        "joined_on": f"2024-{random.randint(1,12):02d}-{random.randint(1,28):02d}"
+        "joined_on": random_date_2024()
     })
 
 db.clients.insert_many(clients)
@@ -42,7 +53,8 @@ for i in range(6):
         "name": course_names[i],
         "instructor": instructors[i],
         "status": random.choice(["ongoing", "scheduled"]),
-        "duration_weeks": random.choice([4, 6, 8])
+        "duration_weeks": random.choice([4, 6, 8]),
+        "price": random.choice([1000, 1500, 2000, 2500])
     })
 
 db.courses.insert_many(courses)
@@ -62,6 +74,7 @@ for i in range(30):
     })
 
 db.classes.insert_many(classes)
+class_dates = {c["_id"]: datetime.strptime(c["date"], "%Y-%m-%d") for c in classes}
 
 # 4. Orders
 orders = []
@@ -73,9 +86,9 @@ for i in range(40):
         "_id": f"order_{i+1}",
         "client_id": client["_id"],
         "service_name": course["name"],
-        "amount": random.randint(1000, 2500),
+        "amount": course["price"],
         "status": status,
-        "created_on": f"2024-{random.randint(1,12):02d}-{random.randint(1,28):02d}"
+        "created_on": random_date_2024()
     })
 
 db.orders.insert_many(orders)
@@ -88,7 +101,7 @@ for i, order in enumerate(random.sample(paid_orders, k=28)):  # some paid orders
         "_id": f"payment_{i+1}",
         "order_id": order["_id"],
         "amount_paid": order["amount"],
-        "payment_date": f"2024-{random.randint(1,12):02d}-{random.randint(1,28):02d}",
+        "payment_date": random_date_2024(),
         "method": random.choice(["UPI", "Credit Card", "Cash", "NetBanking"])
     })
 
@@ -103,7 +116,8 @@ for i in range(60):
         "_id": f"att_{i+1}",
         "class_id": class_obj["_id"],
         "client_id": client["_id"],
-        "attended": random.choice([True, False])
+        "attended": random.choice([True, False]),
+        "date": class_dates[class_obj["_id"]]
     })
 
 db.attendance.insert_many(attendance)
@@ -115,18 +129,22 @@ enquiries = [
         "email": "divya@example.com",
         "phone": "9876543210",
         "notes": "Wants to join Pilates",
-        "created_on": datetime.now(timezone.utc).isoformat()
+        "created_on": datetime.now(timezone.utc)
     },
     {
         "name": "Aarav Patel",
         "email": "aarav@example.com",
         "phone": "9999911111",
         "notes": "Interested in nutrition plan",
-        "created_on": datetime.now(timezone.utc).isoformat()
+        "created_on": datetime.now(timezone.utc)
     }
 ]
 
 db.enquiries.insert_many(enquiries)
 
+# Dashboard KPIs are read from precomputed rollups
+db.kpi_rollups.drop()
+reconcile(db)
+
 
 print("Mock data inserted: 25 clients, 6 courses, 30 classes, 40 orders, 28 payments, 60 attendance records.")
\ No newline at end of file
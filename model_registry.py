@@ -0,0 +1,95 @@
+# model_registry.py
+import os
+import threading
+import time
+
+
+def _rss_bytes():
+    # Resident memory of this process, only available where /proc exists
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _parameter_bytes(obj):
+    # Pipelines and our intent backends keep the torch module on .model,
+    # the zero-shot backend one level further down on .classifier.model
+    candidates = [obj, getattr(obj, "model", None), getattr(getattr(obj, "classifier", None), "model", None)]
+    for candidate in candidates:
+        if candidate is not None and hasattr(candidate, "parameters") and hasattr(candidate, "buffers"):
+            tensors = list(candidate.parameters()) + list(candidate.buffers())
+            return sum(t.numel() * t.element_size() for t in tensors)
+    return None
+
+
+class ModelRegistry:
+    """
+    Loads models on first use (or on warm_up) and shares one instance per
+    process. Records load time and memory for every model it loads.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._stats = {}
+        self._locks = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name, loader):
+        with self._registry_lock:
+            self._loaders[name] = loader
+            self._locks[name] = threading.Lock()
+            self._stats[name] = {"state": "registered"}
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self._loaders:
+            raise KeyError(f"❌ Model not registered: {name}")
+
+        with self._locks[name]:
+            if name in self._models:
+                return self._models[name]
+
+            print(f"[DEBUG] Loading model '{name}'...")
+            self._stats[name] = {"state": "loading"}
+            rss_before = _rss_bytes()
+            started = time.perf_counter()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                self._stats[name] = {"state": "failed", "error": str(e)}
+                raise
+            load_seconds = time.perf_counter() - started
+            rss_after = _rss_bytes()
+
+            param_bytes = _parameter_bytes(model)
+            self._stats[name] = {
+                "state": "ready",
+                "load_seconds": round(load_seconds, 2),
+                "parameter_mb": round(param_bytes / 2**20, 1) if param_bytes is not None else None,
+                "rss_delta_mb": round((rss_after - rss_before) / 2**20, 1) if rss_before is not None else None,
+            }
+            self._models[name] = model
+            print(f"[DEBUG] Model '{name}' loaded: {self._stats[name]}")
+            return model
+
+    def warm_up(self, names=None):
+        for name in names or list(self._loaders):
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"[ERROR] Warm-up of model '{name}' failed: {e}")
+        return self.status()
+
+    def is_ready(self, names=None):
+        return all(name in self._models for name in names or self._loaders)
+
+    def status(self):
+        return {name: dict(stats) for name, stats in self._stats.items()}
+
+
+registry = ModelRegistry()
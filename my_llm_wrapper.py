@@ -1,12 +1,184 @@
 # my_llm_wrapper.py
-from typing import List, Optional
-from langchain_community.llms import Ollama
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
 from crewai.llm import BaseLLM
 
+from events import emit, streaming
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "4096"))
+OLLAMA_NUM_PREDICT = int(os.getenv("OLLAMA_NUM_PREDICT", "512"))
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "120"))
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+
+# One pooled session for every call to Ollama, keeps connections alive between steps
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=OLLAMA_MAX_CONCURRENCY * 2))
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=OLLAMA_MAX_CONCURRENCY * 2))
+
+# Bounds concurrent generations across all wrappers, Ollama on CPU does not gain from more
+_generation_slots = threading.BoundedSemaphore(OLLAMA_MAX_CONCURRENCY)
+
+# Per-run overrides of the Ollama options (e.g. a token cap for the current intent)
+_generation_options = contextvars.ContextVar("generation_options", default={})
+
+_stats_lock = threading.Lock()
+_stats = {
+    "calls": 0,
+    "failures": 0,
+    "prompt_tokens": 0,
+    "completion_tokens": 0,
+    "latency_total_ms": 0.0,
+    "slot_wait_total_ms": 0.0,
+    "last_call": None,
+}
+
+
+@contextmanager
+def generation_options(**options):
+    """Override Ollama options (num_predict, num_ctx, temperature...) for calls made inside the block."""
+    token = _generation_options.set({**_generation_options.get(), **options})
+    try:
+        yield
+    finally:
+        _generation_options.reset(token)
+
+
+def llm_metrics():
+    with _stats_lock:
+        stats = dict(_stats)
+    calls = stats["calls"]
+    stats["avg_latency_ms"] = round(stats["latency_total_ms"] / calls, 1) if calls else 0
+    stats["avg_slot_wait_ms"] = round(stats["slot_wait_total_ms"] / calls, 1) if calls else 0
+    return stats
+
+
 class OllamaCrewAIWrapper(BaseLLM):
-    def __init__(self, model_name="llama3"):
-        self.llm = Ollama(model=model_name)
+    def __init__(self, model_name=OLLAMA_MODEL, num_predict=OLLAMA_NUM_PREDICT, num_ctx=OLLAMA_NUM_CTX,
+                 keep_alive=OLLAMA_KEEP_ALIVE, temperature=None):
+        # BaseLLM attributes crewAI reads; stop words get appended to self.stop by the agent executor
+        self.model = model_name
+        self.temperature = temperature
+        self.stop = []
+        self.num_predict = num_predict
+        self.num_ctx = num_ctx
+        self.keep_alive = keep_alive
+
+    def supports_stop_words(self) -> bool:
+        return True
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def get_context_window_size(self) -> int:
+        return self.num_ctx
+
+    def _payload(self, messages, stop, stream):
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        options = {"num_predict": self.num_predict, "num_ctx": self.num_ctx}
+        if self.temperature is not None:
+            options["temperature"] = self.temperature
+        options.update(_generation_options.get())
+
+        # Stop sequences from the caller and from crewAI (e.g. "\nObservation:"), so Ollama stops
+        # generating where crewAI would cut the text anyway
+        stop_words = list(dict.fromkeys((stop or []) + (self.stop or [])))
+        if stop_words:
+            options["stop"] = stop_words
+        return {
+            "model": self.model,
+            "messages": [{"role": m["role"], "content": m["content"]} for m in messages],
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": options,
+        }
+
+    def call(self, messages: Union[str, List[Dict[str, str]]], stop: Optional[List[str]] = None,
+             callbacks=None, tools=None, available_functions=None) -> Any:
+        stream = streaming()
+        payload = self._payload(messages, stop, stream)
+
+        waited = time.perf_counter()
+        with _generation_slots:
+            started = time.perf_counter()
+            try:
+                res = _session.post(f"{OLLAMA_HOST}/api/chat", json=payload, stream=stream,
+                                    timeout=(OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT))
+                res.raise_for_status()
+                if stream:
+                    # A client is listening for progress, forward tokens as they are generated
+                    chunks, final = [], {}
+                    for line in res.iter_lines():
+                        if not line:
+                            continue
+                        data = json.loads(line)
+                        chunk = data.get("message", {}).get("content", "")
+                        if chunk:
+                            chunks.append(chunk)
+                            emit("token", chunk)
+                        if data.get("done"):
+                            final = data
+                    content = "".join(chunks)
+                else:
+                    final = res.json()
+                    content = final.get("message", {}).get("content", "")
+            except Exception:
+                with _stats_lock:
+                    _stats["failures"] += 1
+                raise
+        self._record(final, started - waited, time.perf_counter() - started)
+        return content
+
+    def _record(self, final, slot_wait, latency):
+        call = {
+            "model": self.model,
+            "prompt_tokens": final.get("prompt_eval_count", 0),
+            "completion_tokens": final.get("eval_count", 0),
+            "latency_ms": round(latency * 1000, 1),
+            "slot_wait_ms": round(slot_wait * 1000, 1),
+            "done_reason": final.get("done_reason"),
+        }
+        print(f"[DEBUG] Ollama call: {call}")
+        with _stats_lock:
+            _stats["calls"] += 1
+            _stats["prompt_tokens"] += call["prompt_tokens"]
+            _stats["completion_tokens"] += call["completion_tokens"]
+            _stats["latency_total_ms"] += call["latency_ms"]
+            _stats["slot_wait_total_ms"] += call["slot_wait_ms"]
+            _stats["last_call"] = call
+
+
+def ping_ollama(model_name=OLLAMA_MODEL, timeout=2):
+    """Return True if the Ollama server is up and has the model pulled."""
+    try:
+        res = _session.get(f"{OLLAMA_HOST}/api/tags", timeout=timeout)
+        res.raise_for_status()
+    except Exception as e:
+        print(f"[ERROR] Ollama ping failed: {e}")
+        return False
+    names = {m.get("name", "") for m in res.json().get("models", [])}
+    return model_name in names or f"{model_name}:latest" in names
 
-    def call(self, prompt: str, stop: Optional[List[str]] = None, callbacks=None) -> str:
-        # Ignore stop and callbacks for now, unless you want to use them
-        return self.llm.invoke(prompt)
+def warm_up_ollama(model_name=OLLAMA_MODEL, timeout=300):
+    """Load the model into Ollama's memory and pin it there; an empty prompt only loads it."""
+    try:
+        res = _session.post(f"{OLLAMA_HOST}/api/generate",
+                            json={"model": model_name, "prompt": "", "keep_alive": OLLAMA_KEEP_ALIVE},
+                            timeout=(OLLAMA_CONNECT_TIMEOUT, timeout))
+        res.raise_for_status()
+        return True
+    except Exception as e:
+        print(f"[ERROR] Ollama warm-up failed: {e}")
+        return False
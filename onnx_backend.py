@@ -0,0 +1,212 @@
+# onnx_backend.py
+import argparse
+import inspect
+import os
+import sys
+
+import numpy as np
+import torch
+from transformers import (
+    AutoModelForSequenceClassification,
+    AutoModelForTokenClassification,
+    AutoTokenizer,
+    TokenClassificationPipeline,
+    ZeroShotClassificationPipeline,
+    pipeline,
+)
+
+# "torch" (default) or "onnx"; the ONNX path falls back to torch if export or loading fails
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "1") == "1"
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", ".onnx_models")
+
+# Example queries from the README, used by --verify
+README_QUERIES = [
+    "Create an order for Varda Kannal for Strength Training",
+    "Create an enquiry for XYZ with email xyz@gmail.com for Pilates Intermediate",
+    "List upcoming classes",
+    "Fetch client services for Ravi Mehta",
+    "Fetch all the courses by instructor Vikram Singh",
+    "Fetch all the courses with Scheduled status",
+    "What was the total revenue for month January of the year 2025",
+    "Retrieve total outstanding payment till now",
+    "Get active and inactive client counts",
+    "Can you retrieve clients with birthdays coming up soon?",
+    "Fetch clients that joined in the last month",
+    "Fetch service analytics",
+    "Fetch attendance report for class_7",
+]
+
+TASK_MODEL_CLASSES = {
+    "ner": AutoModelForTokenClassification,
+    "zero-shot-classification": AutoModelForSequenceClassification,
+}
+
+
+class _LogitsOnly(torch.nn.Module):
+    # Exposes a positional forward that returns only the logits, which is what torch.onnx.export needs
+    def __init__(self, model, input_names):
+        super().__init__()
+        self.model = model
+        self.input_names = input_names
+        self.extra = {"use_cache": False} if "use_cache" in inspect.signature(model.forward).parameters else {}
+
+    def forward(self, *inputs):
+        return self.model(**dict(zip(self.input_names, inputs)), **self.extra, return_dict=False)[0]
+
+
+class _OrtForwardMixin:
+    session = None
+
+    def _ort_logits(self, model_inputs):
+        feeds = {
+            i.name: model_inputs[i.name].cpu().numpy().astype(np.int64)
+            for i in self.session.get_inputs()
+        }
+        return torch.from_numpy(self.session.run(["logits"], feeds)[0])
+
+
+class OrtTokenClassificationPipeline(_OrtForwardMixin, TokenClassificationPipeline):
+    def _forward(self, model_inputs):
+        special_tokens_mask = model_inputs.pop("special_tokens_mask")
+        offset_mapping = model_inputs.pop("offset_mapping", None)
+        sentence = model_inputs.pop("sentence")
+        is_last = model_inputs.pop("is_last")
+        logits = self._ort_logits(model_inputs)
+        return {
+            "logits": logits,
+            "special_tokens_mask": special_tokens_mask,
+            "offset_mapping": offset_mapping,
+            "sentence": sentence,
+            "is_last": is_last,
+            **model_inputs,
+        }
+
+
+class OrtZeroShotClassificationPipeline(_OrtForwardMixin, ZeroShotClassificationPipeline):
+    def _forward(self, inputs):
+        model_inputs = {k: inputs[k] for k in self.tokenizer.model_input_names}
+        return {
+            "candidate_label": inputs["candidate_label"],
+            "sequence": inputs["sequence"],
+            "is_last": inputs["is_last"],
+            "logits": self._ort_logits(model_inputs),
+        }
+
+
+ORT_PIPELINE_CLASSES = {
+    "ner": OrtTokenClassificationPipeline,
+    "zero-shot-classification": OrtZeroShotClassificationPipeline,
+}
+
+
+def export_onnx(task, model_name, quantize=ONNX_QUANTIZE, cache_dir=ONNX_CACHE_DIR):
+    """Export the model to ONNX (and int8 if asked) once, returns the path to load."""
+    base = os.path.join(cache_dir, model_name.replace("/", "__"))
+    fp32_path = os.path.join(base, "model.onnx")
+    int8_path = os.path.join(base, "model.int8.onnx")
+    target = int8_path if quantize else fp32_path
+    if os.path.exists(target):
+        return target
+
+    os.makedirs(base, exist_ok=True)
+    if not os.path.exists(fp32_path):
+        print(f"[DEBUG] Exporting {model_name} to ONNX...")
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = TASK_MODEL_CLASSES[task].from_pretrained(model_name)
+        model.eval()
+        input_names = list(tokenizer.model_input_names)
+        dummy = tokenizer("Fetch attendance report for class_7", return_tensors="pt")
+        logits_axes = {0: "batch", 1: "sequence"} if task == "ner" else {0: "batch"}
+        with torch.inference_mode():
+            torch.onnx.export(
+                _LogitsOnly(model, input_names),
+                tuple(dummy[name] for name in input_names),
+                fp32_path,
+                input_names=input_names,
+                output_names=["logits"],
+                dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in input_names}, "logits": logits_axes},
+                opset_version=14,
+            )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        print(f"[DEBUG] Quantizing {model_name} to int8...")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return target
+
+
+def create_session(path, intra_op_threads=ONNX_INTRA_OP_THREADS):
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if intra_op_threads:
+        options.intra_op_num_threads = intra_op_threads
+    return ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+
+def load_onnx_pipeline(task, model_name, **kwargs):
+    session = create_session(export_onnx(task, model_name))
+    # The torch model is only needed for its config and the pipeline plumbing,
+    # its weights are moved to the meta device so they do not stay resident.
+    model = TASK_MODEL_CLASSES[task].from_pretrained(model_name)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    pipe = pipeline(task, model=model, tokenizer=tokenizer, pipeline_class=ORT_PIPELINE_CLASSES[task], **kwargs)
+    pipe.session = session
+    pipe.model.to("meta")
+    return pipe
+
+
+# {model name: backend actually serving it}, reported on /metrics so a silent
+# torch fallback under INFERENCE_BACKEND=onnx is visible
+active_backends = {}
+
+
+def build_pipeline(task, model_name, backend=INFERENCE_BACKEND, **kwargs):
+    """Build a transformers pipeline on the configured backend."""
+    if backend == "onnx":
+        try:
+            model = load_onnx_pipeline(task, model_name, **kwargs)
+            active_backends[model_name] = "onnx"
+            return model
+        except Exception as e:
+            print(f"[ERROR] ONNX backend unavailable for {model_name}: {e}")
+            print(f"⚠️ INFERENCE_BACKEND=onnx but ONNX is NOT in use for {model_name}; serving it on torch")
+            active_backends[model_name] = "torch (onnx fallback)"
+            return pipeline(task, model=model_name, **kwargs)
+    active_backends[model_name] = "torch"
+    return pipeline(task, model=model_name, **kwargs)
+
+
+def verify(queries=README_QUERIES):
+    """Check that the ONNX NER pipeline gives the same merged entities as torch."""
+    from agent_logic import merge_entities
+
+    kwargs = {"aggregation_strategy": "simple"}
+    torch_ner = build_pipeline("ner", "dslim/bert-base-NER", backend="torch", **kwargs)
+    onnx_ner = load_onnx_pipeline("ner", "dslim/bert-base-NER", **kwargs)
+
+    mismatches = 0
+    for query in queries:
+        expected = merge_entities(torch_ner(query))
+        actual = merge_entities(onnx_ner(query))
+        if expected != actual:
+            mismatches += 1
+            print(f"❌ {query!r}\n   torch: {expected}\n   onnx:  {actual}")
+        else:
+            print(f"✅ {query!r}: {actual}")
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export and check the ONNX inference backend")
+    parser.add_argument("--export", action="store_true", help="export (and quantize) the NER and zero-shot models")
+    parser.add_argument("--verify", action="store_true", help="compare merge_entities output with torch on the README queries")
+    args = parser.parse_args()
+
+    if args.export:
+        print(export_onnx("ner", "dslim/bert-base-NER"))
+        print(export_onnx("zero-shot-classification", "facebook/bart-large-mnli"))
+    if args.verify:
+        sys.exit(1 if verify() else 0)
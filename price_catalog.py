@@ -0,0 +1,80 @@
+# price_catalog.py
+# Service names and prices from the courses collection, held in memory for
+# order creation (CreateOrderTool) and service extraction (agent_logic).
+import os
+import threading
+import time
+
+from pymongo import MongoClient
+
+from client_resolver import normalize_name
+from indexes import DB_NAME, MONGO_URI
+
+DEFAULT_SERVICE_PRICE = float(os.getenv("DEFAULT_SERVICE_PRICE", "1000"))
+PRICE_CATALOG_TTL = float(os.getenv("PRICE_CATALOG_TTL", "300"))
+# After a failed load, keep serving the fallback instead of retrying on every call
+RETRY_AFTER = 30
+
+
+class PriceCatalog:
+    """
+    {normalized service name: {"name", "price"}} built from courses. Reloaded
+    after `ttl` seconds or on invalidate(), e.g. after a courses import.
+    """
+
+    def __init__(self, db=None, ttl=PRICE_CATALOG_TTL):
+        self._db = db
+        self.ttl = ttl
+        self._entries = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000)[DB_NAME]
+        return self._db
+
+    def invalidate(self):
+        self._expires_at = 0.0
+
+    def _load(self):
+        entries = {}
+        for course in self.db.courses.find({}, {"name": 1, "price": 1}):
+            if course.get("name"):
+                entries[normalize_name(course["name"])] = {
+                    "name": course["name"],
+                    "price": course.get("price", DEFAULT_SERVICE_PRICE),
+                }
+        return entries
+
+    def _current(self):
+        if time.monotonic() < self._expires_at:
+            return self._entries
+        with self._lock:
+            if time.monotonic() < self._expires_at:
+                return self._entries
+            try:
+                self._entries = self._load()
+                self._expires_at = time.monotonic() + self.ttl
+                print(f"[DEBUG] Price catalog loaded with {len(self._entries)} services")
+            except Exception as e:
+                # Keep whatever was loaded last time
+                print(f"[ERROR] Price catalog load failed: {e}")
+                self._expires_at = time.monotonic() + RETRY_AFTER
+        return self._entries
+
+    def lookup(self, service_name):
+        """{"name", "price"} for a service name in any case/spacing, or None."""
+        return self._current().get(normalize_name(service_name))
+
+    def price(self, service_name):
+        entry = self.lookup(service_name)
+        return entry["price"] if entry else DEFAULT_SERVICE_PRICE
+
+    def service_names(self, fallback=()):
+        entries = self._current()
+        return [entry["name"] for entry in entries.values()] if entries else list(fallback)
+
+
+price_catalog = PriceCatalog()
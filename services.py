@@ -0,0 +1,211 @@
+# services.py
+# Write operations shared by the HTTP endpoints in main.py and the agent tools,
+# so tools do not have to call back into our own API over HTTP.
+from datetime import datetime, timezone
+from typing import Literal, Optional
+
+from bson import ObjectId
+from pydantic import BaseModel, ConfigDict, Field
+
+import kpi_rollups
+from answer_cache import answer_cache
+from client_resolver import client_name_index
+from price_catalog import price_catalog
+
+
+class Enquiry(BaseModel):
+    name: str
+    email: str
+    phone: str
+    notes: str
+
+class Order(BaseModel):
+    client_id: str
+    service_name: str
+    amount: float
+
+class Payment(BaseModel):
+    order_id: str
+    amount_paid: float
+    method: Optional[str] = None
+
+class ClientStatusUpdate(BaseModel):
+    status: Literal["active", "inactive"]
+
+
+# --- Records accepted by the bulk import endpoints (historical data keeps its own ids/dates) ---
+# Dates arrive as "YYYY-MM-DD"/ISO strings and are stored as BSON dates
+class ImportRecord(BaseModel):
+    model_config = ConfigDict(populate_by_name=True, coerce_numbers_to_str=True)
+    id: Optional[str] = Field(default=None, alias="_id")
+
+class ClientRecord(ImportRecord):
+    name: str
+    email: str
+    phone: str
+    birthdate: Optional[datetime] = None
+    status: Literal["active", "inactive"] = "active"
+    joined_on: Optional[datetime] = None
+
+class OrderRecord(ImportRecord, Order):
+    status: Literal["paid", "pending"] = "pending"
+    created_on: Optional[datetime] = None
+
+class PaymentRecord(ImportRecord):
+    order_id: str
+    amount_paid: float
+    payment_date: datetime
+    method: Optional[str] = None
+
+class AttendanceRecord(ImportRecord):
+    class_id: str
+    client_id: str
+    attended: bool
+    date: Optional[datetime] = None
+
+class EnquiryRecord(ImportRecord, Enquiry):
+    created_on: Optional[datetime] = None
+
+class CourseRecord(ImportRecord):
+    name: str
+    instructor: Optional[str] = None
+    status: Optional[str] = None
+    duration_weeks: Optional[int] = None
+    price: Optional[float] = None
+
+
+class ClientNotFound(Exception):
+    pass
+
+class OrderNotFound(Exception):
+    pass
+
+
+def enquiry_document(enquiry: Enquiry):
+    data = enquiry.model_dump()
+    data["created_on"] = datetime.now(timezone.utc)
+    return data
+
+def order_document(order: Order):
+    data = order.model_dump()
+    # String ids like the imported/mock orders ("order_12"), so payments can reference them as given
+    data["_id"] = str(ObjectId())
+    data["status"] = "pending"
+    data["created_on"] = datetime.now(timezone.utc)
+    return data
+
+def payment_document(payment: Payment):
+    data = payment.model_dump(exclude_none=True)
+    data["payment_date"] = datetime.now(timezone.utc)
+    return data
+
+def _order_filter(order_id):
+    # Orders created before string ids were assigned have ObjectId _ids
+    if ObjectId.is_valid(order_id):
+        return {"_id": {"$in": [order_id, ObjectId(order_id)]}}
+    return {"_id": order_id}
+
+def _is_settled(order, paid_total):
+    return order.get("status") == "pending" and paid_total >= order["amount"]
+
+def _after_enquiry_created(data):
+    answer_cache.invalidate("enquiries")
+
+def _after_order_created(data):
+    answer_cache.invalidate("orders")
+
+def _after_payment_recorded(data):
+    answer_cache.invalidate("payments", "orders")
+
+def _after_client_status_changed():
+    answer_cache.invalidate("clients")
+
+def after_bulk_import(collection):
+    answer_cache.invalidate(collection)
+    if collection == "clients":
+        client_name_index.mark_stale()
+    if collection == "courses":
+        price_catalog.invalidate()
+
+
+# --- Sync versions, for tools running on the crew executor (pymongo Database) ---
+def create_enquiry(db, enquiry: Enquiry):
+    data = enquiry_document(enquiry)
+    result = db.enquiries.insert_one(data)
+    _after_enquiry_created(data)
+    return {"status": "success", "enquiry_id": str(result.inserted_id)}
+
+def create_order(db, order: Order):
+    if not db.clients.find_one({"_id": order.client_id}, {"_id": 1}):
+        raise ClientNotFound(order.client_id)
+    data = order_document(order)
+    result = db.orders.insert_one(data)
+    kpi_rollups.apply(db, kpi_rollups.order_created_ops(data))
+    _after_order_created(data)
+    return {"status": "success", "order_id": str(result.inserted_id)}
+
+def record_payment(db, payment: Payment):
+    order = db.orders.find_one(_order_filter(payment.order_id), {"amount": 1, "status": 1})
+    if not order:
+        raise OrderNotFound(payment.order_id)
+    data = payment_document(payment)
+    result = db.payments.insert_one(data)
+    ops = kpi_rollups.payment_ops(data)
+    paid_total = sum(p["amount_paid"] for p in db.payments.find({"order_id": {"$in": [payment.order_id, order["_id"]]}}, {"amount_paid": 1}))
+    # Only the request that flips the order to paid moves it out of the outstanding total
+    if _is_settled(order, paid_total) and db.orders.update_one(
+        {"_id": order["_id"], "status": "pending"}, {"$set": {"status": "paid"}}
+    ).modified_count:
+        ops += kpi_rollups.order_paid_ops(order)
+    kpi_rollups.apply(db, ops)
+    _after_payment_recorded(data)
+    return {"status": "success", "payment_id": str(result.inserted_id)}
+
+def update_client_status(db, client_id, update: ClientStatusUpdate):
+    before = db.clients.find_one_and_update({"_id": client_id}, {"$set": {"status": update.status}}, {"status": 1})
+    if not before:
+        raise ClientNotFound(client_id)
+    kpi_rollups.apply(db, kpi_rollups.client_status_ops(before.get("status"), update.status))
+    _after_client_status_changed()
+    return {"status": "success", "client_id": client_id, "client_status": update.status}
+
+
+# --- Async versions, for the FastAPI endpoints (AsyncMongoClient database) ---
+async def acreate_enquiry(db, enquiry: Enquiry):
+    data = enquiry_document(enquiry)
+    result = await db.enquiries.insert_one(data)
+    _after_enquiry_created(data)
+    return {"status": "success", "enquiry_id": str(result.inserted_id)}
+
+async def acreate_order(db, order: Order):
+    if not await db.clients.find_one({"_id": order.client_id}, {"_id": 1}):
+        raise ClientNotFound(order.client_id)
+    data = order_document(order)
+    result = await db.orders.insert_one(data)
+    await kpi_rollups.aapply(db, kpi_rollups.order_created_ops(data))
+    _after_order_created(data)
+    return {"status": "success", "order_id": str(result.inserted_id)}
+
+async def arecord_payment(db, payment: Payment):
+    order = await db.orders.find_one(_order_filter(payment.order_id), {"amount": 1, "status": 1})
+    if not order:
+        raise OrderNotFound(payment.order_id)
+    data = payment_document(payment)
+    result = await db.payments.insert_one(data)
+    ops = kpi_rollups.payment_ops(data)
+    paid_total = sum([p["amount_paid"] async for p in db.payments.find({"order_id": {"$in": [payment.order_id, order["_id"]]}}, {"amount_paid": 1})])
+    if _is_settled(order, paid_total) and (await db.orders.update_one(
+        {"_id": order["_id"], "status": "pending"}, {"$set": {"status": "paid"}}
+    )).modified_count:
+        ops += kpi_rollups.order_paid_ops(order)
+    await kpi_rollups.aapply(db, ops)
+    _after_payment_recorded(data)
+    return {"status": "success", "payment_id": str(result.inserted_id)}
+
+async def aupdate_client_status(db, client_id, update: ClientStatusUpdate):
+    before = await db.clients.find_one_and_update({"_id": client_id}, {"$set": {"status": update.status}}, {"status": 1})
+    if not before:
+        raise ClientNotFound(client_id)
+    await kpi_rollups.aapply(db, kpi_rollups.client_status_ops(before.get("status"), update.status))
+    _after_client_status_changed()
+    return {"status": "success", "client_id": client_id, "client_status": update.status}
@@ -0,0 +1,84 @@
+# snapshot.py
+# Every dashboard KPI in one call, straight from MongoDBTool (no NLP or crew).
+import asyncio
+import calendar
+import time
+from datetime import datetime
+
+import kpi_rollups
+from dates import format_date
+from tools.MongoToolWrapper import mongo
+
+SNAPSHOT_ATTENDANCE_LIMIT = 20
+
+
+def _kpis():
+    # Revenue, outstanding and client counts all come from one read of the rollups
+    today = datetime.today()
+    rollups = kpi_rollups.read_rollups(mongo.db)
+    if rollups is None:
+        month_name = calendar.month_name[today.month]
+        return {
+            "source": "live",
+            "revenue_total": mongo.get_total_revenue(),
+            "revenue_this_month": mongo.get_total_revenue(month=month_name, year=str(today.year)),
+            "outstanding_payments": mongo.get_outstanding_payments(),
+            "clients": mongo.get_active_inactive_clients(),
+        }
+    status = rollups.get("client_status", {})
+    return {
+        "source": "rollups",
+        "revenue_total": kpi_rollups.revenue_total(rollups),
+        "revenue_this_month": kpi_rollups.revenue_total(rollups, today.year, today.month),
+        "outstanding_payments": rollups.get("outstanding", {}).get("total", 0),
+        "clients": {"active": status.get("active", 0), "inactive": status.get("inactive", 0)},
+        "reconciled_at": format_date(rollups["meta"]["reconciled_at"]),
+    }
+
+def _upcoming_birthdays():
+    return [
+        {"name": c["name"], "birthdate": format_date(c.get("birthdate"))}
+        for c in mongo.get_clients_with_upcoming_birthdays()
+    ]
+
+def _new_clients():
+    return [
+        {"name": c["name"], "joined_on": format_date(c.get("joined_on"))}
+        for c in mongo.get_clients_joined_this_month()
+    ]
+
+def _attendance():
+    return mongo.get_attendance_stats(limit=SNAPSHOT_ATTENDANCE_LIMIT)
+
+
+METRICS = {
+    "kpis": _kpis,
+    "upcoming_birthdays": _upcoming_birthdays,
+    "new_clients_this_month": _new_clients,
+    "service_analytics": mongo.get_service_analytics,
+    "attendance": _attendance,
+}
+
+
+async def _timed(fn):
+    started = time.perf_counter()
+    try:
+        value, error = await asyncio.to_thread(fn), None
+    except Exception as e:
+        print(f"[ERROR] Snapshot metric {fn.__name__} failed: {e}")
+        value, error = None, str(e)
+    return value, error, round((time.perf_counter() - started) * 1000, 1)
+
+
+async def build_snapshot():
+    """Run every metric concurrently; one failing metric is reported without failing the rest."""
+    started = time.perf_counter()
+    results = await asyncio.gather(*(_timed(fn) for fn in METRICS.values()))
+    snapshot = {"metrics": {}, "timings_ms": {}, "errors": {}}
+    for name, (value, error, elapsed_ms) in zip(METRICS, results):
+        snapshot["metrics"][name] = value
+        snapshot["timings_ms"][name] = elapsed_ms
+        if error:
+            snapshot["errors"][name] = error
+    snapshot["timings_ms"]["total"] = round((time.perf_counter() - started) * 1000, 1)
+    return snapshot
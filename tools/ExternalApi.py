@@ -1,10 +1,27 @@
 # tools/external_api.py
 
+import os
+
 import requests
+from pymongo import MongoClient
+
+import services
+
+# Only set this when the API runs in another process/host; by default the
+# tools call the service layer in-process instead of looping back over HTTP.
+GYMINTEL_API_URL = os.getenv("GYMINTEL_API_URL")
 
 class ExternalAPI:
-    def __init__(self, base_url="http://localhost:8000"):
+    def __init__(self, base_url=GYMINTEL_API_URL, db=None):
         self.base_url = base_url
+        self._db = db
+        self.session = requests.Session() if base_url else None
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = MongoClient("mongodb://localhost:27017")["fitnessDB"]
+        return self._db
 
     def create_enquiry(self, name: str, email: str, phone: str, notes: str = ""):
         """
@@ -18,7 +35,10 @@ class ExternalAPI:
         }
         print(f"[DEBUG] in ExternalApi.py- create_enquiry() data: {data}")
         try:
-            res = requests.post(f"{self.base_url}/enquiry", json=data)
+            if not self.base_url:
+                return services.create_enquiry(self.db, services.Enquiry(**data))
+            res = self.session.post(f"{self.base_url}/enquiry", json=data)
+            res.raise_for_status()
             return res.json()
         except Exception as e:
             return {"error": str(e)}
@@ -29,12 +49,20 @@ class ExternalAPI:
             "service_name": service_name,
             "amount": amount
         }
-        print(f"[ExternalAPI] Sending POST to /order with: {data}")
         try:
-            res = requests.post(f"{self.base_url}/order", json=data)
+            if not self.base_url:
+                print(f"[ExternalAPI] Creating order in-process with: {data}")
+                res = services.create_order(self.db, services.Order(**data))
+                print(f"[ExternalAPI] Success: {res}")
+                return res
+            print(f"[ExternalAPI] Sending POST to /order with: {data}")
+            res = self.session.post(f"{self.base_url}/order", json=data)
             res.raise_for_status()
             print(f"[ExternalAPI] Success: {res.json()}")
             return res.json()
+        except services.ClientNotFound:
+            print(f"[ExternalAPI] Failed: client {client_id} not found")
+            return {"error": "Client not found"}
         except Exception as e:
             print(f"[ExternalAPI] Failed: {str(e)}")
-            return {"error": str(e)}
\ No newline at end of file
+            return {"error": str(e)}
@@ -2,9 +2,11 @@ from pydantic import BaseModel
 from crewai.tools import BaseTool
 from tools.ExternalApi import ExternalAPI
 from tools.MongoTool import MongoDBTool
+from price_catalog import DEFAULT_SERVICE_PRICE, price_catalog
 
-api = ExternalAPI()
 mongo_tool = MongoDBTool()
+# In-process service calls share the tool's Mongo connection pool
+api = ExternalAPI(db=mongo_tool.db)
 
 # --- Argument Schemas ---
 class EnquiryArgs(BaseModel):
@@ -29,7 +31,10 @@ class CreateEnquiryTool(BaseTool):
             return "❌ Missing contact information to create enquiry."
         print(f"[DEBUG] in ExternalApiWrapper- CreateEnquiryTool {PER}--{PHONE}---{EMAIL}----{MISC}")
         notes = MISC or "No additional notes."
-        res = api.create_enquiry(PER, EMAIL, PHONE, notes)
+        # Enquiry requires every field; one contact detail is enough to follow up
+        res = api.create_enquiry(PER or "Unknown", EMAIL or "Unknown", PHONE or "Unknown", notes)
+        if "error" in res:
+            return f"❌ Failed to create enquiry: {res['error']}"
         return f"✅ Enquiry created: {res}"
 
 
@@ -50,9 +55,13 @@ class CreateOrderTool(BaseTool):
             return f"❌ No client found with name: {PER}"
 
         client_id = client["_id"]
-        existing_order = mongo_tool.db.orders.find_one({"service_name": MISC})
-        print(f"[DEBUG] existing orders checked for price. found {existing_order}")
+        service = price_catalog.lookup(MISC)
+        print(f"[DEBUG] price catalog entry for '{MISC}': {service}")
+        if not service:
+            print(f"⚠️ '{MISC}' is not in the price catalog, using the default price.")
+            service = {"name": MISC, "price": DEFAULT_SERVICE_PRICE}
 
-        amount = existing_order.get("amount", 1000) if existing_order else 1000
-        res = api.create_order(client_id, MISC, amount)
+        res = api.create_order(client_id, service["name"], service["price"])
+        if "error" in res:
+            return f"❌ Failed to create order: {res['error']}"
         return f"✅ Order created: {res}"
\ No newline at end of file
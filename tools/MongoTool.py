@@ -1,27 +1,54 @@
-from collections import defaultdict
 import datetime
 from pymongo import MongoClient
 
+from executors import CREW_WORKERS
+from indexes import CASE_INSENSITIVE
+from client_resolver import client_name_index, normalize_name
+from dates import birth_md_ranges, date_window, month_range
+import kpi_rollups
+
+FUZZY_ACCEPT_SCORE = 0.55
+FUZZY_ACCEPT_MARGIN = 0.1
+
 class MongoDBTool:
-    def __init__(self, uri="mongodb://localhost:27017", db_name="fitnessDB"):
-        self.client = MongoClient(uri)
+    # Stays on the sync driver: crewAI tools are synchronous and run on the crew
+    # executor threads, so the pool is sized to match that executor.
+    def __init__(self, uri="mongodb://localhost:27017", db_name="fitnessDB", max_pool_size=CREW_WORKERS):
+        self.client = MongoClient(uri, maxPoolSize=max_pool_size)
         self.db = self.client[db_name]
 
     # 1. CLIENT DATA
     def get_client_by_name(self, name):
         name = name.strip()
         print(f"[DEBUG] Searching client with name: '{name}'")
-        matches = list(self.db.clients.find({
-            "name": {"$regex": f"^{name}$", "$options": "i"}
-        }))
-        
+        matches = list(self.db.clients.find({"name_normalized": normalize_name(name)}).limit(10))
         if not matches:
-            return None
+            # Clients not backfilled with name_normalized yet (see client_resolver.py --backfill)
+            matches = list(self.db.clients.find({"name": name}).collation(CASE_INSENSITIVE).limit(10))
+
+        if not matches:
+            return self._resolve_fuzzy_client(name)
         elif len(matches) > 1:
             print(f"⚠️ Multiple matches for name '{name}', returning the first one.")
         
         return matches[0]  # or use additional logic to pick preferred one
 
+    def find_client_candidates(self, name, limit=5):
+        return client_name_index.candidates(self.db, name, limit=limit)
+
+    def _resolve_fuzzy_client(self, name):
+        # Accept a misspelt name (e.g. from NER) only when one distinct name clearly wins;
+        # clients sharing that name are handled like multiple exact matches
+        matches = client_name_index.best_names(self.db, name, limit=2)
+        if not matches or matches[0]["score"] < FUZZY_ACCEPT_SCORE:
+            return None
+        if len(matches) > 1 and matches[0]["score"] - matches[1]["score"] < FUZZY_ACCEPT_MARGIN:
+            print(f"⚠️ Ambiguous fuzzy match for '{name}': {matches}")
+            return None
+        if len(matches[0]["ids"]) > 1:
+            print(f"⚠️ Multiple clients named '{matches[0]['name']}', returning the first one.")
+        print(f"[DEBUG] Fuzzy matched '{name}' to {matches[0]}")
+        return self.db.clients.find_one({"_id": matches[0]["ids"][0]})
 
     def get_client_by_email(self, email):
         return self.db.clients.find_one({"email": email})
@@ -76,36 +103,33 @@ class MongoDBTool:
             "October": 10, "November": 11, "December": 12
         }
 
-        match_conditions = []
-
+        month_num = None
         if month and month!= "Unknown":
             month_num = MONTHS.get(month.capitalize())
             if not month_num:
                 return f"❌ Invalid month: {month}"
-            match_conditions.append({
-                "$eq": [
-                    { "$month": { "$dateFromString": { "dateString": "$payment_date" } } },
-                    month_num
-                ]
-            })
 
+        year_num = int(year) if year and year != "Unknown" else None
+        # A single month of a single year is one rollup document
+        ids = [kpi_rollups.revenue_id(year_num, month_num)] if year_num and month_num else None
+        rollups = kpi_rollups.read_rollups(self.db, ids)
+        if rollups:
+            return kpi_rollups.revenue_total(rollups, year_num, month_num)
+
+        # No rollups yet (never reconciled): query payments directly
         if year and year!="Unknown":
-            match_conditions.append({
-                "$eq": [
-                    { "$year": { "$dateFromString": { "dateString": "$payment_date" } } },
-                    int(year)
-                ]
-            })
+            # Range scan on the payment_date index
+            start, end = month_range(int(year), month_num)
+            match = {"payment_date": {"$gte": start, "$lt": end}}
+        elif month_num:
+            # Month of any year has no contiguous range, so it still filters per document
+            match = {"$expr": {"$eq": [{"$month": "$payment_date"}, month_num]}}
+        else:
+            match = {}
 
         pipeline = []
-        if match_conditions:
-            pipeline.append({
-                "$match": {
-                    "$expr": {
-                        "$and": match_conditions
-                    }
-                }
-            })
+        if match:
+            pipeline.append({"$match": match})
 
         pipeline.append({
             "$group": {
@@ -118,49 +142,42 @@ class MongoDBTool:
         return result[0]["total"] if result else 0
 
     def get_outstanding_payments(self):
-        pending_orders = self.db.orders.find({"status": "pending"})
-        return sum(o["amount"] for o in pending_orders)
+        rollup = self._read_rollup("outstanding")
+        if rollup:
+            return rollup["total"]
+        result = list(self.db.orders.aggregate(kpi_rollups.OUTSTANDING_PIPELINE))
+        return result[0]["total"] if result else 0
 
     def get_active_inactive_clients(self):
+        rollup = self._read_rollup("client_status")
+        if rollup:
+            return {"active": rollup.get("active", 0), "inactive": rollup.get("inactive", 0)}
         active = self.db.clients.count_documents({"status": "active"})
         inactive = self.db.clients.count_documents({"status": "inactive"})
         return {"active": active, "inactive": inactive}
     
+    def _read_rollup(self, rollup_id):
+        # Only trusted once a reconcile has written the meta document
+        rollups = kpi_rollups.read_rollups(self.db, [rollup_id])
+        return rollups.get(rollup_id) if rollups else None
+
     from datetime import datetime, timedelta
 
-    def get_clients_with_upcoming_birthdays(self):
-        today = datetime.datetime.today()
+    def get_clients_with_upcoming_birthdays(self, days=30):
+        # birth_md is indexed; a window crossing New Year becomes two range queries
+        today = datetime.date.today()
         upcoming_clients = []
-
-        for client in self.db.clients.find():
-            try:
-                bday_str = client.get("birthdate")
-                bday_obj = datetime.datetime.strptime(bday_str, "%Y-%m-%d")
-
-                this_year_bday = bday_obj.replace(year=today.year)
-
-                # If it already passed this year, check next year
-                if this_year_bday < today:
-                    this_year_bday = this_year_bday.replace(year=today.year + 1)
-
-                # Check if within next 30 days
-                if 0 <= (this_year_bday - today).days <= 30:
-                    upcoming_clients.append(client)
-
-            except Exception as e:
-                print(f"[ERROR] Parsing birthday for {client.get('name')}: {e}")
-                continue
-
+        for first, last in birth_md_ranges(today, days):
+            upcoming_clients.extend(self.db.clients.find(
+                {"birth_md": {"$gte": first, "$lte": last}},
+                {"_id": 0, "name": 1, "birthdate": 1},
+            ).sort("birth_md", 1))
         return upcoming_clients
 
     def get_clients_joined_this_month(self):
         # Get start and end of current month
         today = datetime.datetime.today()
-        start_of_month = datetime.datetime(today.year, today.month, 1)
-        if today.month == 12:
-            end_of_month = datetime.datetime(today.year + 1, 1, 1)
-        else:
-            end_of_month = datetime.datetime(today.year, today.month + 1, 1)
+        start_of_month, end_of_month = month_range(today.year, today.month)
         clients_collection = self.db["clients"]
 
         # Query clients whose 'joined_on' date is within this month
@@ -174,31 +191,43 @@ class MongoDBTool:
         return new_clients
 
 
-    def get_service_analytics(self):
-        orders = list(self.db.orders.find({"status": "paid"}))
-
-        course_counts = defaultdict(int)
-        monthly_trend = defaultdict(int)
-
-        for o in orders:
-            course = o.get("service_name", "Unknown")
-            course_counts[course] += 1
-
-            try:
-                date = datetime.datetime.strptime(o["created_on"], "%Y-%m-%d")
-                key = f"{date.year}-{str(date.month).zfill(2)}"
-                monthly_trend[key] += 1
-            except Exception as e:
-                print("[ERROR] Parsing date in order:", o.get("_id"), e)
-                continue
-
-        top_courses = sorted(course_counts.items(), key=lambda x: -x[1])[:5]
-        trend_sorted = sorted(monthly_trend.items())
+    def get_service_analytics(self, start_date=None, end_date=None, top_n=5):
+        """Top services, monthly enrollment trends and completion rates in one $facet query."""
+        pipeline = []
+        window = date_window(start_date, end_date)
+        if window:
+            pipeline.append({"$match": {"created_on": window}})
+        pipeline.append({"$facet": {
+            "top_services": [
+                {"$match": {"status": "paid"}},
+                {"$group": {"_id": "$service_name", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+                {"$limit": top_n},
+            ],
+            "trends": [
+                {"$match": {"status": "paid", "created_on": {"$type": "date"}}},
+                {"$group": {"_id": {"$dateToString": {"format": "%Y-%m", "date": "$created_on"}}, "count": {"$sum": 1}}},
+                {"$sort": {"_id": 1}},
+            ],
+            "completion_rates": [
+                {"$group": {"_id": "$service_name", "total": {"$sum": 1},
+                            "paid": {"$sum": {"$cond": [{"$eq": ["$status", "paid"]}, 1, 0]}}}},
+                {"$sort": {"_id": 1}},
+            ],
+        }})
+
+        result = next(self.db.orders.aggregate(pipeline), {})
+        top_courses = result.get("top_services", [])
+        trends = result.get("trends", [])
+        completion = result.get("completion_rates", [])
 
         return {
-            "top_services": [f"{course}: {count} enrollments" for course, count in top_courses] or ["No data available."],
-            "trends": [f"{month}: {count} enrollments" for month, count in trend_sorted] or ["No data available."],
-            "completion_rates": ["No data available."]  # You can populate this later
+            "top_services": [f"{row['_id'] or 'Unknown'}: {row['count']} enrollments" for row in top_courses] or ["No data available."],
+            "trends": [f"{row['_id']}: {row['count']} enrollments" for row in trends] or ["No data available."],
+            "completion_rates": [
+                f"{row['_id'] or 'Unknown'}: {round(row['paid'] / row['total'] * 100, 2)}% ({row['paid']}/{row['total']} paid)"
+                for row in completion
+            ] or ["No data available."]
         }
 
     def get_course_completion_rates(self):
@@ -208,68 +237,59 @@ class MongoDBTool:
             {"$project": {"completion_rate": {"$divide": ["$paid", "$total"]}}}
         ]))
 
-    from collections import defaultdict
-
-    def get_attendance_stats(self, class_id=None):
-        records = list(self.db.attendance.find())
-
-        if class_id is not None and True:
-            class_data = defaultdict(lambda: {"attended": 0, "total": 0})
-
-            for rec in records:
-                if(rec["class_id"]!= class_id):
-                    continue
-                cid = rec["class_id"]
-                class_data[cid]["total"] += 1
-                if rec.get("attended") is True:
-                    class_data[cid]["attended"] += 1
-
-            # reports=[]
-            report = {}
-
-            for cid, stats in class_data.items():
-                pct = (stats["attended"] / stats["total"]) * 100 if stats["total"] else 0
-                dropoff = 100 - pct
-                report = {
-                    "class_id": cid,
-                    "attendance_percent": f"{round(pct, 2)}%",
-                    "drop_off_rate": f"{round(dropoff, 2)}%",
-                    "total_sessions": stats["total"]
-                }
-                # reports.append(report)
-
-            return report
-        
-        else:
-            class_data = defaultdict(lambda: {"attended": 0, "total": 0})
-
-            for rec in records:
-                cid = rec["class_id"]
-                class_data[cid]["total"] += 1
-                if rec.get("attended") is True:
-                    class_data[cid]["attended"] += 1
-
-            reports=[]
-            report = {}
-
-            for cid, stats in class_data.items():
-                pct = (stats["attended"] / stats["total"]) * 100 if stats["total"] else 0
-                dropoff = 100 - pct
-                report = {
-                    "class_id": cid,
-                    "attendance_percent": f"{round(pct, 2)}%",
-                    "drop_off_rate": f"{round(dropoff, 2)}%",
-                    "total_sessions": stats["total"]
-                }
-                reports.append(report)
-
-            return reports
-
-
+    def _attendance_pipeline(self, match, skip=0, limit=None):
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": "$class_id",
+                "total": {"$sum": 1},
+                "attended": {"$sum": {"$cond": [{"$eq": ["$attended", True]}, 1, 0]}},
+            }},
+            {"$sort": {"_id": 1}},
+        ]
+        if skip:
+            pipeline.append({"$skip": skip})
+        if limit:
+            pipeline.append({"$limit": limit})
+        return pipeline
+
+    @staticmethod
+    def _attendance_match(class_id=None, start_date=None, end_date=None):
+        match = {}
+        if class_id is not None:
+            match["class_id"] = class_id
+        window = date_window(start_date, end_date)
+        if window:
+            match["date"] = window
+        return match
+
+    @staticmethod
+    def _attendance_report(row):
+        pct = (row["attended"] / row["total"]) * 100 if row["total"] else 0
+        return {
+            "class_id": row["_id"],
+            "attendance_percent": f"{round(pct, 2)}%",
+            "drop_off_rate": f"{round(100 - pct, 2)}%",
+            "total_sessions": row["total"]
+        }
 
-    def get_class_dropout_rate(self, class_id):
-        records = list(self.db.attendance.find({"class_id": class_id}))
-        if not records:
+    def get_attendance_stats(self, class_id=None, start_date=None, end_date=None, skip=0, limit=None):
+        """
+        Attendance % and drop-off per class, grouped in MongoDB. One class
+        returns a dict ({} if it has no rows); all classes return a list
+        sorted by class id, paged with skip/limit.
+        """
+        match = self._attendance_match(class_id, start_date, end_date)
+        if class_id is not None:
+            rows = list(self.db.attendance.aggregate(self._attendance_pipeline(match)))
+            return self._attendance_report(rows[0]) if rows else {}
+
+        cursor = self.db.attendance.aggregate(self._attendance_pipeline(match, skip, limit), allowDiskUse=True)
+        return [self._attendance_report(row) for row in cursor]
+
+    def get_class_dropout_rate(self, class_id, start_date=None, end_date=None):
+        match = self._attendance_match(class_id, start_date, end_date)
+        rows = list(self.db.attendance.aggregate(self._attendance_pipeline(match)))
+        if not rows:
             return None
-        dropped = sum(1 for r in records if not r["attended"])
-        return dropped / len(records)
\ No newline at end of file
+        return (rows[0]["total"] - rows[0]["attended"]) / rows[0]["total"]
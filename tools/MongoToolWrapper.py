@@ -3,6 +3,7 @@ from crewai.tools import BaseTool
 from pydantic import BaseModel
 from tools.MongoTool import MongoDBTool
 from tools.ExternalApi import ExternalAPI
+from dates import format_date
 
 mongo = MongoDBTool()
 api = ExternalAPI()
@@ -55,8 +56,8 @@ class GetClientInfoTool(BaseTool):
             "email": client["email"],
             "phone": client["phone"],
             "status": client["status"],
-            "birthdate": client["birthdate"],
-            "joining date": client["joined_on"]
+            "birthdate": format_date(client["birthdate"]),
+            "joining date": format_date(client["joined_on"])
         }
 
 class GetClientServicesTool(BaseTool):
@@ -269,7 +270,7 @@ class FetchClientBirthdaysTool(BaseTool):
         if not birthdays:
             return "🎉 No client birthdays in the next 30 days."
 
-        lines = [f"{client['name']} (🎂 {client['birthdate']})" for client in birthdays]
+        lines = [f"{client['name']} (🎂 {format_date(client['birthdate'])})" for client in birthdays]
         return "🎂 Clients with birthdays in the next 30 days:\n" + "\n".join(lines)
 
     def invoke(self, input_data, **kwargs):
@@ -313,7 +314,7 @@ class NewClientsThisMonthTool(BaseTool):
         if not clients:
             return "📭 No clients joined this month."
 
-        lines = [f"{c['name']} (📅 {c['join_date']})" for c in clients]
+        lines = [f"{c['name']} (📅 {format_date(c['joined_on'])})" for c in clients]
         return "🆕 Clients who joined this month:\n" + "\n".join(lines)
 
     def invoke(self, input_data, **kwargs):
@@ -332,17 +333,18 @@ class NewClientsThisMonthTool(BaseTool):
         return self._run(**input_data)
     
 class ServiceAnalyticsSchema(BaseModel):
-    pass
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
     
 class ServiceAnalyticsTool(BaseTool):
     name: str = "Service Analytics"
-    description: str = "Analyze enrollment trends, top services, and course completion rates."
+    description: str = "Analyze enrollment trends, top services, and course completion rates, optionally between start_date and end_date (YYYY-MM-DD)."
     args_schema: type = ServiceAnalyticsSchema
 
-    def _run(self, **kwargs) -> str:
+    def _run(self, start_date: str = None, end_date: str = None, **kwargs) -> str:
         print("[DEBUG] ServiceAnalyticsTool._run was called")
         
-        analytics = mongo.get_service_analytics() 
+        analytics = mongo.get_service_analytics(start_date=start_date, end_date=end_date)
         if not analytics:
             return "📉 No service analytics data available."
 
@@ -354,21 +356,29 @@ class ServiceAnalyticsTool(BaseTool):
         return response
 
     def invoke(self, input_data=None, **kwargs):
-        return self._run()
+        return self._run(**input_data) if isinstance(input_data, dict) else self._run()
     
 class AttendanceReportSchema(BaseModel):
     class_name: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    page: Optional[int] = 1
 
+ATTENDANCE_PAGE_SIZE = 50
     
 class AttendanceReportTool(BaseTool):
     name: str = "Attendance Reports"
-    description: str = "Get attendance percentage by class and drop-off rates."
+    description: str = "Get attendance percentage by class and drop-off rates, optionally between start_date and end_date (YYYY-MM-DD)."
     args_schema: type = AttendanceReportSchema
 
-    def _run(self, class_id: str = None, **kwargs) -> str:
+    def _run(self, class_id: str = None, start_date: str = None, end_date: str = None, page: int = 1, **kwargs) -> str:
         print("[DEBUG] AttendanceReportTool._run called with class:", class_id)
 
-        data = mongo.get_attendance_stats(class_id=class_id)
+        page = max(int(page or 1), 1)
+        data = mongo.get_attendance_stats(
+            class_id=class_id, start_date=start_date, end_date=end_date,
+            skip=(page - 1) * ATTENDANCE_PAGE_SIZE, limit=ATTENDANCE_PAGE_SIZE
+        )
         if not data:
             return "📭 No attendance data available."
 
@@ -390,6 +400,8 @@ class AttendanceReportTool(BaseTool):
                     f"📅 Total Sessions: {d['total_sessions']}"
                 )
             response = "📋 Attendance Report for All Classes:\n\n" + "\n\n".join(lines)
+            if len(data) == ATTENDANCE_PAGE_SIZE:
+                response += f"\n\n➡️ More classes on page {page + 1}."
         else:
             response = "⚠️ Unexpected data format received from MongoDB."
 
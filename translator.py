@@ -0,0 +1,177 @@
+# translator.py
+import os
+import sqlite3
+import threading
+import time
+
+from deep_translator import GoogleTranslator
+
+from cache_utils import LRUTTLCache
+from model_registry import registry
+
+# Backends are tried in order; a backend that does not support the language pair is skipped
+TRANSLATION_BACKENDS = os.getenv("TRANSLATION_BACKENDS", "marian,google")
+TRANSLATION_DB_PATH = os.getenv("TRANSLATION_DB_PATH", ".translation_cache.sqlite3")
+# Source languages whose Marian models load during warm-up instead of on the first query ("" for none)
+TRANSLATION_WARM_UP = os.getenv("TRANSLATION_WARM_UP", "de,hi")
+
+MARIAN_MODELS = {
+    ("de", "en"): "Helsinki-NLP/opus-mt-de-en",
+    ("hi", "en"): "Helsinki-NLP/opus-mt-hi-en",
+}
+
+
+class TranslationStore:
+    """On-disk translation cache keyed by (source language, target language, text)."""
+
+    def __init__(self, path=TRANSLATION_DB_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS translations (
+                    source_lang TEXT NOT NULL,
+                    target_lang TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    translated TEXT NOT NULL,
+                    backend TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (source_lang, target_lang, text)
+                )
+            """)
+
+    def get(self, source, target, text):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT translated FROM translations WHERE source_lang = ? AND target_lang = ? AND text = ?",
+                (source, target, text)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, source, target, text, translated, backend):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)",
+                (source, target, text, translated, backend, time.time())
+            )
+
+
+class GoogleBackend:
+    name = "google"
+
+    def supports(self, source, target):
+        return True
+
+    def translate(self, text, source, target):
+        # The source passed in is a langdetect code, only good for picking a Marian model:
+        # its codes differ from Google's (zh-cn vs zh-CN, he vs iw) and it misdetects short
+        # queries, so Google always detects the source itself.
+        # A new translator per call: GoogleTranslator keeps the query in instance state,
+        # so sharing one across inference threads can mix up concurrent translations.
+        return GoogleTranslator(source="auto", target=target).translate(text)
+
+
+class MarianBackend:
+    """Local MarianMT models, loaded through the model registry on first use."""
+    name = "marian"
+
+    def __init__(self, models=MARIAN_MODELS):
+        self.models = models
+        for (source, target), model_name in models.items():
+            registry.register(f"translation_{source}_{target}", self._loader(model_name))
+
+    @staticmethod
+    def _loader(model_name):
+        def load():
+            from transformers import pipeline
+            return pipeline("translation", model=model_name)
+        return load
+
+    def supports(self, source, target):
+        return (source, target) in self.models
+
+    def model_names(self, sources):
+        return [f"translation_{source}_{target}" for source, target in self.models if source in sources]
+
+    def translate(self, text, source, target):
+        return registry.get(f"translation_{source}_{target}")(text)[0]["translation_text"]
+
+
+BACKEND_CLASSES = {
+    "google": GoogleBackend,
+    "marian": MarianBackend,
+}
+
+
+class Translator:
+    """
+    Translation with an in-memory hot cache in front of a persistent SQLite
+    cache, and an ordered list of backends behind both.
+    """
+
+    def __init__(self, backends, store, hot_cache=None):
+        self.backends = backends
+        self.store = store
+        self.hot = hot_cache or LRUTTLCache(max_entries=1024, ttl=None)
+        self._stats_lock = threading.Lock()
+        self._stats = {"hot_hits": 0, "store_hits": 0, "failures": 0, "backend_calls": {}}
+
+    def _count(self, key, backend=None):
+        with self._stats_lock:
+            if backend:
+                calls = self._stats["backend_calls"]
+                calls[backend] = calls.get(backend, 0) + 1
+            else:
+                self._stats[key] += 1
+
+    def translate(self, text, source="auto", target="en"):
+        key = (source, target, text)
+        translated = self.hot.get(key)
+        if translated is not None:
+            self._count("hot_hits")
+            return translated
+
+        translated = self.store.get(source, target, text)
+        if translated is not None:
+            self._count("store_hits")
+            self.hot.set(key, translated)
+            return translated
+
+        for backend in self.backends:
+            if not backend.supports(source, target):
+                continue
+            try:
+                translated = backend.translate(text, source, target)
+            except Exception as e:
+                print(f"[ERROR] {backend.name} translation failed: {e}")
+                continue
+            self._count(None, backend.name)
+            self.store.put(source, target, text, translated, backend.name)
+            self.hot.set(key, translated)
+            return translated
+
+        # Every backend failed (e.g. offline with no local model for this pair)
+        self._count("failures")
+        print(f"[ERROR] No translation for '{text}' ({source} -> {target}), using original text")
+        return text
+
+    def warm_up_model_names(self, languages=TRANSLATION_WARM_UP):
+        """Registry names of the local models to load at startup for these source languages."""
+        sources = {lang.strip() for lang in languages.split(",") if lang.strip()}
+        return [name for backend in self.backends if hasattr(backend, "model_names") for name in backend.model_names(sources)]
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats, backend_calls=dict(self._stats["backend_calls"]))
+        stats["hot_cache"] = self.hot.stats()
+        return stats
+
+
+def build_translator(backend_names=TRANSLATION_BACKENDS, db_path=TRANSLATION_DB_PATH):
+    backends = []
+    for name in backend_names.split(","):
+        name = name.strip()
+        if name not in BACKEND_CLASSES:
+            raise ValueError(f"❌ Unknown translation backend: {name}")
+        backends.append(BACKEND_CLASSES[name]())
+    return Translator(backends, TranslationStore(db_path))